@@ -7,7 +7,9 @@ Version: 1.0
 import streamlit as st
 import pandas as pd
 import numpy as np
-from io import StringIO
+import codecs
+import hashlib
+import itertools
 import json
 from datetime import datetime
 
@@ -17,6 +19,10 @@ from structure_analysis import StructureAnalyzer
 from visualizations import MotifVisualizer
 from statistics_module import StatisticalAnalyzer
 
+# Byte tables for cleaning sequence lines: uppercase acgt, drop everything else
+_DNA_UPPER = bytes.maketrans(b'acgt', b'ACGT')
+_DNA_DELETE = bytes(c for c in range(256) if c not in b'ACGTacgt')
+
 # Page configuration
 st.set_page_config(
     page_title="AptaMotif Analyzer",
@@ -195,10 +201,10 @@ def main():
             )
             
             if uploaded_file is not None:
-                sequence_input = StringIO(uploaded_file.getvalue().decode("utf-8")).read()
-                
                 if st.button("🚀 Process Uploaded File", type="primary"):
-                    sequences = parse_sequences(sequence_input)
+                    # Decode line by line instead of materializing the whole file
+                    uploaded_file.seek(0)
+                    sequences = parse_sequences(codecs.iterdecode(uploaded_file, "utf-8"))
                     if sequences:
                         st.session_state.sequences = sequences
                         st.success(f"✅ Processed {len(sequences)} sequences successfully!")
@@ -229,16 +235,15 @@ def main():
                         config['reverse_complement']
                     )
                     
-                    # Run motif analysis
-                    analyzer = MotifAnalyzer(
+                    # Run motif analysis (cached on sequence content and parameters)
+                    motifs = run_motif_discovery(
+                        sequences_digest(random_regions),
                         random_regions,
-                        min_length=min_motif_length,
-                        max_length=max_motif_length,
-                        min_occurrences=min_occurrences
+                        min_motif_length,
+                        max_motif_length,
+                        min_occurrences
                     )
                     
-                    motifs = analyzer.find_motifs()
-                    
                     # Statistical analysis
                     stats_analyzer = StatisticalAnalyzer(
                         motifs,
@@ -281,9 +286,12 @@ def main():
                     rna_sequences = {seq_id: seq.replace('T', 'U') 
                                     for seq_id, seq in random_regions.items()}
                     
-                    # Run structure prediction
-                    structure_analyzer = StructureAnalyzer(temperature=temperature)
-                    structures = structure_analyzer.predict_structures(rna_sequences)
+                    # Run structure prediction (cached on sequence content and temperature)
+                    structures = run_structure_prediction(
+                        sequences_digest(rna_sequences),
+                        rna_sequences,
+                        temperature
+                    )
                     
                     if 'results' not in st.session_state.results or st.session_state.results is None:
                         st.session_state.results = {}
@@ -349,12 +357,20 @@ def main():
 
 
 def parse_sequences(text):
-    """Parse sequences from FASTA or plain text format."""
+    """
+    Parse sequences from FASTA or plain text format.
+    
+    Accepts either a string or an iterable of lines (e.g. a decoded file
+    stream), so large uploads are processed without building one big string.
+    """
     sequences = {}
     current_id = None
     current_seq = []
     
-    lines = text.strip().split('\n')
+    if isinstance(text, str):
+        lines = text.strip().split('\n')
+    else:
+        lines = itertools.dropwhile(lambda line: not line.strip(), text)
     
     for i, line in enumerate(lines):
         line = line.strip()
@@ -364,7 +380,7 @@ def parse_sequences(text):
         if line.startswith('>'):
             # Save previous sequence
             if current_id:
-                sequences[current_id] = ''.join(current_seq).upper()
+                sequences[current_id] = ''.join(current_seq)
             # Start new sequence
             current_id = line[1:].strip() or f"Sequence_{i+1}"
             current_seq = []
@@ -372,19 +388,26 @@ def parse_sequences(text):
             # Handle both FASTA and plain text
             if current_id is None:
                 current_id = f"Sequence_{len(sequences)+1}"
-            # Remove any whitespace and non-DNA characters
-            cleaned = ''.join(c for c in line.upper() if c in 'ATCG')
-            current_seq.append(cleaned)
+            # Uppercase and remove any whitespace and non-DNA characters
+            cleaned = line.encode('ascii', 'ignore').translate(_DNA_UPPER, _DNA_DELETE)
+            current_seq.append(cleaned.decode('ascii'))
     
     # Save last sequence
     if current_id:
-        sequences[current_id] = ''.join(current_seq).upper()
+        sequences[current_id] = ''.join(current_seq)
     
     return sequences
 
 
+@st.cache_data(show_spinner=False)
 def extract_random_regions(sequences, forward_primer, reverse_complement):
-    """Extract the random region from full sequences."""
+    """
+    Extract the random region from full sequences.
+    
+    Cached on the sequences and primers, so the motif and structure tabs reuse
+    the same extraction instead of rescanning on every button press. Primer
+    warnings are replayed on cache hits.
+    """
     random_regions = {}
     
     for seq_id, seq in sequences.items():
@@ -408,6 +431,39 @@ def extract_random_regions(sequences, forward_primer, reverse_complement):
     return random_regions
 
 
+def sequences_digest(sequences):
+    """Content hash of a {sequence_id: sequence} dict, used as a cache key."""
+    digest = hashlib.blake2b(digest_size=16)
+    for seq_id, seq in sorted(sequences.items()):
+        digest.update(f"{seq_id}\0{seq}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+@st.cache_data(show_spinner=False)
+def run_motif_discovery(digest, _sequences, min_length, max_length, min_occurrences):
+    """
+    Find shared motifs, cached across reruns.
+    
+    The sequences are keyed by their digest (the underscore keeps Streamlit
+    from hashing the dict itself), so re-running with unchanged inputs
+    returns immediately.
+    """
+    analyzer = MotifAnalyzer(
+        _sequences,
+        min_length=min_length,
+        max_length=max_length,
+        min_occurrences=min_occurrences
+    )
+    return analyzer.find_motifs()
+
+
+@st.cache_data(show_spinner=False)
+def run_structure_prediction(digest, _rna_sequences, temperature):
+    """Predict secondary structures, cached on sequence digest and temperature."""
+    structure_analyzer = StructureAnalyzer(temperature=temperature)
+    return structure_analyzer.predict_structures(_rna_sequences)
+
+
 def display_sequence_summary(sequences):
     """Display summary of loaded sequences."""
     st.subheader("Sequence Summary")
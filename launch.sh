@@ -9,7 +9,7 @@ echo ""
 # Check if streamlit is installed
 if ! command -v streamlit &> /dev/null; then
     echo "❌ Streamlit not found. Installing required packages..."
-    pip install streamlit biopython logomaker plotly scipy pandas numpy matplotlib seaborn statsmodels --break-system-packages
+    pip install streamlit biopython logomaker plotly 'scipy>=1.11' pandas numpy matplotlib seaborn numba joblib pyahocorasick --break-system-packages
     echo "✅ Installation complete!"
     echo ""
 fi
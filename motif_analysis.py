@@ -3,9 +3,233 @@ Motif Analysis Module
 Finds shared k-mers across sequences
 """
 
-from collections import defaultdict, Counter
+from collections import defaultdict
+import numpy as np
 import pandas as pd
 from itertools import combinations
+from numpy.lib.stride_tricks import sliding_window_view
+
+from sequence_search import encode_sequences, search_space
+
+# Numba is optional; without it motif discovery uses the NumPy suffix array
+try:
+    from numba import njit, prange, get_num_threads
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Map ASCII bytes to 2-bit base codes; anything other than A/C/G/T is invalid
+_BASE_CODES = np.full(256, 255, dtype=np.uint8)
+_BASE_CODES[np.frombuffer(b'ACGT', dtype=np.uint8)] = np.arange(4, dtype=np.uint8)
+
+# Inverse of _BASE_CODES for the four valid codes
+_BASE_LETTERS = np.frombuffer(b'ACGT', dtype=np.uint8)
+
+# Separator placed between sequences in the concatenated text
+_SENTINEL = b'$'
+
+# Largest k-mer that fits in a single uint64 at 2 bits per base
+_MAX_PACKED_K = 32
+
+
+def _encode_sequence(sequence):
+    """Map a DNA string to an array of 2-bit base codes (255 = invalid base)."""
+    return _BASE_CODES[np.frombuffer(sequence.encode('ascii', 'replace'), dtype=np.uint8)]
+
+
+def _invalid_windows(codes, k):
+    """
+    Flag k-mer windows that contain an invalid base.
+    
+    A prefix sum of invalid positions answers each window in O(1), so the
+    whole mask costs O(L) instead of O(L * k).
+    """
+    bad_prefix = np.concatenate(([0], np.cumsum(codes == 255)))
+    return bad_prefix[k:] - bad_prefix[:-k] > 0
+
+
+def _pack_kmers(codes, k):
+    """
+    Pack every k-mer window of an encoded sequence into a uint64.
+    
+    Returns the packed codes and a mask of windows containing an invalid base.
+    """
+    windows = sliding_window_view(codes, k)
+    bad = _invalid_windows(codes, k)
+    shifts = np.arange(2 * (k - 1), -1, -2, dtype=np.uint64)
+    packed = np.bitwise_or.reduce(windows.astype(np.uint64) << shifts, axis=1)
+    return packed, bad
+
+
+def _decode_kmers(packed, k):
+    """Decode packed uint64 k-mer codes back into ASCII DNA bytes."""
+    shifts = np.arange(2 * (k - 1), -1, -2, dtype=np.uint64)
+    bases = (packed[:, None] >> shifts) & np.uint64(3)
+    raw = _BASE_LETTERS[bases.astype(np.intp)].tobytes()
+    return [raw[i:i + k] for i in range(0, len(raw), k)]
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _find_slot(keys, occupied, code, shift):
+        """Linear-probe an open-addressing table for code (or its free slot)."""
+        slot_mask = len(keys) - 1
+        slot = np.int64((code * np.uint64(0x9E3779B97F4A7C15)) >> shift)
+        while occupied[slot] and keys[slot] != code:
+            slot = (slot + 1) & slot_mask
+        return slot
+    
+    @njit(cache=True)
+    def _table_bits(n_windows, k):
+        """Log2 of a table size keeping n_windows k-mers at most 25% full."""
+        if k < 31:
+            n_windows = min(n_windows, 1 << (2 * k))
+        bits_needed = 2
+        while (1 << bits_needed) < 4 * n_windows:
+            bits_needed += 1
+        return bits_needed
+    
+    @njit(cache=True)
+    def _seed_windows(enc_mat, lengths, k, window_codes, alive):
+        """
+        Fill the packed code of every k-base window and flag the valid ones.
+        
+        Rolling codes make each position O(1); window i is stored at
+        window_codes[sid, i] and is valid when it holds no invalid base.
+        """
+        mask = np.uint64(0xFFFFFFFFFFFFFFFF) >> np.uint64(64 - 2 * k)
+        for sid in range(enc_mat.shape[0]):
+            code = np.uint64(0)
+            run = 0
+            for i in range(lengths[sid]):
+                base = enc_mat[sid, i]
+                if base < 0:
+                    run = 0
+                    continue
+                code = ((code << np.uint64(2)) | np.uint64(base)) & mask
+                run += 1
+                if run >= k:
+                    window_codes[sid, i - k + 1] = code
+                    alive[sid, i - k + 1] = True
+    
+    @njit(cache=True, parallel=True)
+    def _scan_kmers(enc_mat, lengths, k, min_occurrences, n_chunks, window_codes, alive, extend):
+        """
+        Find the k-mers shared by at least min_occurrences sequences.
+        
+        enc_mat holds 2-bit base codes padded with -1 (invalid bases are
+        -1 too). window_codes and alive describe the windows of the
+        previous length (or, if not extend, the seeded k-base windows).
+        When extending, a k-base window is only a candidate if both of
+        its (k-1)-base windows were shared, since a k-mer cannot occur
+        in more sequences than its prefix or suffix; its code is the
+        prefix code plus one base. On return both arrays describe the
+        shared k-base windows, ready for k + 1.
+        
+        K-mers are kept in preallocated open-addressing tables
+        (power-of-two size, at most 25% full) sized from the candidate
+        count. Sequences are split into n_chunks runs of whole
+        64-sequence bitset words, scanned in parallel. The first pass
+        counts distinct sequences per k-mer in one table per chunk
+        (sequences are visited in order, so remembering the last one
+        seen is enough); chunks hold disjoint sequences, so their counts
+        add up exactly when the tables are merged. The second pass fills
+        occurrence bitsets for the k-mers that reach min_occurrences;
+        each chunk owns its bitset words, so threads never write the
+        same word.
+        
+        Returns the packed k-mer codes and one row of uint64 bitset words
+        per k-mer (bit i set = sequence i contains it).
+        """
+        n_seqs = enc_mat.shape[0]
+        n_words = (n_seqs + 63) // 64
+        
+        per_chunk = 64 * max(1, (n_words + n_chunks - 1) // n_chunks)
+        n_chunks = max(1, (n_seqs + per_chunk - 1) // per_chunk)
+        
+        # Size the per-chunk tables from the busiest chunk's candidates
+        chunk_windows = np.zeros(n_chunks, dtype=np.int64)
+        for chunk in prange(n_chunks):
+            for sid in range(chunk * per_chunk, min(n_seqs, (chunk + 1) * per_chunk)):
+                for i in range(lengths[sid] - k + 1):
+                    if alive[sid, i] and (not extend or alive[sid, i + 1]):
+                        chunk_windows[chunk] += 1
+        local_bits = _table_bits(chunk_windows.max(), k)
+        local_shift = np.uint64(64 - local_bits)
+        local_keys = np.zeros((n_chunks, 1 << local_bits), dtype=np.uint64)
+        local_occupied = np.zeros((n_chunks, 1 << local_bits), dtype=np.bool_)
+        local_counts = np.zeros((n_chunks, 1 << local_bits), dtype=np.int64)
+        
+        for chunk in prange(n_chunks):
+            keys = local_keys[chunk]
+            occupied = local_occupied[chunk]
+            counts = local_counts[chunk]
+            last_seen = np.full(1 << local_bits, -1, dtype=np.int64)
+            for sid in range(chunk * per_chunk, min(n_seqs, (chunk + 1) * per_chunk)):
+                for i in range(lengths[sid] - k + 1):
+                    if not (alive[sid, i] and (not extend or alive[sid, i + 1])):
+                        continue
+                    code = window_codes[sid, i]
+                    if extend:
+                        code = (code << np.uint64(2)) | np.uint64(enc_mat[sid, i + k - 1])
+                    slot = _find_slot(keys, occupied, code, local_shift)
+                    if not occupied[slot]:
+                        occupied[slot] = True
+                        keys[slot] = code
+                    if last_seen[slot] != sid:
+                        last_seen[slot] = sid
+                        counts[slot] += 1
+        
+        # Merge the chunk tables into one (a single chunk is used as is)
+        if n_chunks == 1:
+            shift = local_shift
+            keys = local_keys[0]
+            occupied = local_occupied[0]
+            counts = local_counts[0]
+        else:
+            table_bits = _table_bits(chunk_windows.sum(), k)
+            shift = np.uint64(64 - table_bits)
+            keys = np.zeros(1 << table_bits, dtype=np.uint64)
+            occupied = np.zeros(1 << table_bits, dtype=np.bool_)
+            counts = np.zeros(1 << table_bits, dtype=np.int64)
+            for chunk in range(n_chunks):
+                for local_slot in range(1 << local_bits):
+                    if not local_occupied[chunk, local_slot]:
+                        continue
+                    code = local_keys[chunk, local_slot]
+                    slot = _find_slot(keys, occupied, code, shift)
+                    if not occupied[slot]:
+                        occupied[slot] = True
+                        keys[slot] = code
+                    counts[slot] += local_counts[chunk, local_slot]
+        
+        shared = np.flatnonzero(counts >= min_occurrences)
+        row_of = np.full(len(keys), -1, dtype=np.int64)
+        row_of[shared] = np.arange(len(shared))
+        
+        bits = np.zeros((len(shared), n_words), dtype=np.uint64)
+        if len(shared) == 0:
+            return keys[shared], bits
+        
+        # Windows are visited in ascending order, so overwriting window i
+        # never affects the (k-1)-base window i + 1 still to be read
+        for chunk in prange(n_chunks):
+            for sid in range(chunk * per_chunk, min(n_seqs, (chunk + 1) * per_chunk)):
+                bit = np.uint64(1) << np.uint64(sid & 63)
+                for i in range(lengths[sid] - k + 1):
+                    if not (alive[sid, i] and (not extend or alive[sid, i + 1])):
+                        alive[sid, i] = False
+                        continue
+                    code = window_codes[sid, i]
+                    if extend:
+                        code = (code << np.uint64(2)) | np.uint64(enc_mat[sid, i + k - 1])
+                    row = row_of[_find_slot(keys, occupied, code, shift)]
+                    alive[sid, i] = row >= 0
+                    window_codes[sid, i] = code
+                    if row >= 0:
+                        bits[row, sid >> 6] |= bit
+        
+        return keys[shared], bits
 
 
 class MotifAnalyzer:
@@ -29,10 +253,19 @@ class MotifAnalyzer:
             Minimum number of sequences that must share a motif (default: 2)
         """
         self.sequences = sequences
+        # ASCII copies for searching (non-ASCII characters become b'?')
+        self.sequences_b = encode_sequences(sequences)
+        # Sequence index i is bit i of every occurrence bitset
+        self.seq_id_list = list(sequences.keys())
+        self.sid_of = {seq_id: i for i, seq_id in enumerate(self.seq_id_list)}
+        # 2-bit base codes of every sequence, encoded once and shared by the scans
+        self.encoded = {seq_id: _encode_sequence(seq) for seq_id, seq in sequences.items()}
         self.min_length = min_length
         self.max_length = max_length
         self.min_occurrences = min_occurrences
         self.motifs = None
+        self._suffix_array = None
+        self._occurrences = {}
     
     def extract_kmers(self, sequence, k):
         """
@@ -49,13 +282,18 @@ class MotifAnalyzer:
         --------
         set : Set of k-mers found in the sequence
         """
-        kmers = set()
-        for i in range(len(sequence) - k + 1):
-            kmer = sequence[i:i+k]
-            # Only include k-mers with valid DNA bases
-            if all(base in 'ATCG' for base in kmer):
-                kmers.add(kmer)
-        return kmers
+        codes = _encode_sequence(sequence)
+        if k <= 0 or len(codes) < k:
+            return set()
+        
+        if k > _MAX_PACKED_K:
+            # Too long to pack; slice only the windows made of valid bases
+            bad = _invalid_windows(codes, k)
+            return {sequence[i:i+k] for i in np.flatnonzero(~bad)}
+        
+        # Deduplicate as integers and decode each distinct k-mer once
+        packed, bad = _pack_kmers(codes, k)
+        return {kmer.decode('ascii') for kmer in _decode_kmers(np.unique(packed[~bad]), k)}
     
     def find_motifs(self):
         """
@@ -65,81 +303,335 @@ class MotifAnalyzer:
         --------
         pandas.DataFrame : DataFrame with motif information
         """
-        # Dictionary to store which sequences contain each motif
-        motif_occurrences = defaultdict(set)
-        
-        # For each k-mer length
-        for k in range(self.min_length, self.max_length + 1):
-            # Extract k-mers from each sequence
-            for seq_id, sequence in self.sequences.items():
-                kmers = self.extract_kmers(sequence, k)
-                
-                # Record which sequences contain each k-mer
-                for kmer in kmers:
-                    motif_occurrences[kmer].add(seq_id)
+        # Compiled scan when available, otherwise a single sweep over a
+        # suffix array of all sequences
+        if NUMBA_AVAILABLE and self.max_length <= _MAX_PACKED_K:
+            motif_occurrences = self._scan_compiled()
+        else:
+            motif_occurrences = self._scan_suffix_array()
         
         # Filter motifs by minimum occurrences
         filtered_motifs = {
-            motif: seq_ids 
-            for motif, seq_ids in motif_occurrences.items()
-            if len(seq_ids) >= self.min_occurrences
+            motif: bitset 
+            for motif, bitset in motif_occurrences.items()
+            if bitset.bit_count() >= self.min_occurrences
         }
         
         # Remove redundant motifs (if a motif is contained in a longer motif with same occurrence)
         filtered_motifs = self._remove_redundant_motifs(filtered_motifs)
         
-        # Create DataFrame
-        motif_data = []
-        for motif, seq_ids in filtered_motifs.items():
-            motif_data.append({
-                'Motif': motif,
-                'Length': len(motif),
-                'Count': len(seq_ids),
-                'Frequency': len(seq_ids) / len(self.sequences),
-                'Sequences': ','.join(sorted(seq_ids))
-            })
+        # Motifs are bytes during discovery; decode each survivor once
+        filtered_motifs = {
+            motif.decode('ascii'): bitset for motif, bitset in filtered_motifs.items()
+        }
+        self._occurrences = filtered_motifs
+        
+        # Create DataFrame column by column; motifs sharing an occurrence set
+        # share its ID list, which is only spelled out once per set
+        n = len(filtered_motifs)
+        motifs = list(filtered_motifs)
+        lengths = np.fromiter(map(len, motifs), dtype=np.int64, count=n)
+        set_of = {}
+        rows = np.fromiter(
+            (set_of.setdefault(bitset, len(set_of)) for bitset in filtered_motifs.values()),
+            dtype=np.int64, count=n
+        )
+        distinct = list(set_of)
+        set_counts = np.fromiter((bitset.bit_count() for bitset in distinct), dtype=np.int64, count=len(distinct))
+        id_lists = self._decode_occurrences(distinct)
+        counts = set_counts[rows]
         
-        self.motifs = pd.DataFrame(motif_data)
+        # Sort by count (descending) and then by length (descending); lexsort
+        # is stable, so ties keep the longest-first discovery order
+        order = np.lexsort((-lengths, -counts))
+        motifs = [motifs[i] for i in order.tolist()]
+        sequences = [id_lists[row] for row in rows[order].tolist()]
+        lengths = lengths[order]
+        counts = counts[order]
         
-        # Sort by count (descending) and then by length (descending)
-        if len(self.motifs) > 0:
-            self.motifs = self.motifs.sort_values(
-                by=['Count', 'Length'], 
-                ascending=[False, False]
-            ).reset_index(drop=True)
+        if n > 0:
+            self.motifs = pd.DataFrame({
+                'Motif': motifs,
+                'Length': lengths,
+                'Count': counts,
+                'Frequency': counts / len(self.sequences),
+                'Sequences': sequences
+            })
+        else:
+            self.motifs = pd.DataFrame()
         
         return self.motifs
     
+    def _build_suffix_array(self):
+        """
+        Build a depth-limited generalized suffix array over all sequences.
+        
+        Sequences are concatenated with sentinels and every suffix is sorted
+        on its first max_length bases, which is all that motif discovery
+        ever looks at. Bases are packed 2 bits each into uint64 words so the
+        sort runs entirely in NumPy.
+        
+        Returns:
+        --------
+        dict : 'codes' is the concatenated base codes and 'sa' the sorted
+            suffix start positions in it. Per suffix-array entry: 'lcp' is the
+            number of leading bases shared with the previous entry, 'owner'
+            the sequence index, 'offset' the position within that sequence,
+            'valid_length' the number of ACGT bases (capped at max_length)
+            starting there and 'words' the packed sort keys.
+        """
+        depth = self.max_length
+        sentinel = _BASE_CODES[np.frombuffer(_SENTINEL, dtype=np.uint8)]
+        parts = [part for seq_codes in self.encoded.values() for part in (seq_codes, sentinel)]
+        codes = np.concatenate(parts) if parts else sentinel[:0]
+        n = len(codes)
+        
+        # Sequence index of every text position (sentinels belong to the
+        # sequence they terminate)
+        lengths = np.array([len(seq_codes) + 1 for seq_codes in self.encoded.values()], dtype=np.int64)
+        owner = np.repeat(np.arange(len(lengths)), lengths)
+        seq_start = np.cumsum(lengths) - lengths
+        
+        # Number of consecutive valid bases starting at each position
+        bad = np.flatnonzero(codes == 255)
+        positions = np.arange(n)
+        next_bad = bad[np.searchsorted(bad, positions)]
+        valid_length = np.minimum(next_bad - positions, depth)
+        
+        # Only suffixes that can hold a motif of min_length take part
+        sa = np.flatnonzero(valid_length >= self.min_length)
+        valid_length = valid_length[sa]
+        
+        # Pack the first `depth` bases of each suffix, 32 bases per word,
+        # zero-filling past the end of the valid run
+        padded = np.concatenate([codes, np.zeros(depth, dtype=np.uint8)])
+        n_words = (depth + 31) // 32
+        words = [np.zeros(len(sa), dtype=np.uint64) for _ in range(n_words)]
+        for j in range(depth):
+            base = np.where(valid_length > j, padded[sa + j], 0).astype(np.uint64)
+            words[j // 32] = (words[j // 32] << np.uint64(2)) | base
+        
+        # Sort lexicographically; shorter valid runs go first on ties so that
+        # suffixes sharing a k-base prefix stay contiguous for every k
+        order = np.lexsort([valid_length] + words[::-1])
+        sa = sa[order]
+        valid_length = valid_length[order]
+        words = [w[order] for w in words]
+        
+        # Longest common prefix between neighbouring suffixes
+        lcp = np.zeros(len(sa), dtype=np.int64)
+        same = np.ones(max(len(sa) - 1, 0), dtype=bool)
+        for j in range(1, depth + 1):
+            w = (j - 1) // 32
+            word_bases = min(32, depth - 32 * w)
+            shift = np.uint64(2 * (word_bases - (j - 32 * w)))
+            prefix = words[w] >> shift
+            same &= prefix[1:] == prefix[:-1]
+            lcp[1:] += same
+        if len(sa) > 1:
+            lcp[1:] = np.minimum(lcp[1:], np.minimum(valid_length[1:], valid_length[:-1]))
+        
+        return {
+            'codes': codes,
+            'sa': sa,
+            'lcp': lcp,
+            'owner': owner[sa],
+            'offset': sa - seq_start[owner[sa]],
+            'valid_length': valid_length,
+            'words': words,
+        }
+    
+    def _get_suffix_array(self):
+        """Build the suffix array on first use and reuse it afterwards."""
+        if self._suffix_array is None:
+            self._suffix_array = self._build_suffix_array()
+        return self._suffix_array
+    
+    def _scan_suffix_array(self):
+        """
+        Collect shared k-mers from LCP intervals of the suffix array.
+        
+        For each length k the suffixes sharing a k-base prefix form one
+        contiguous interval (bounded where lcp < k), so a single pass per k
+        yields every distinct k-mer together with the sequences it occurs in.
+        A (k+1)-interval lies inside a k-interval and cannot reach more
+        sequences, so only suffixes in shared k-intervals are carried on to
+        the next length.
+        
+        Returns:
+        --------
+        dict : Dictionary mapping motif (ASCII bytes) to its occurrence bitset
+        """
+        motif_occurrences = {}
+        if not self.sequences or self.max_length < self.min_length:
+            return motif_occurrences
+        
+        n_seqs = len(self.seq_id_list)
+        n_words = (n_seqs + 63) // 64
+        index = self._get_suffix_array()
+        codes, sa, lcp = index['codes'], index['sa'], index['lcp']
+        owner, valid_length = index['owner'], index['valid_length']
+        
+        # Suffix-array rows still in play
+        live = np.arange(len(sa))
+        for k in range(self.min_length, self.max_length + 1):
+            # Interval boundaries for this k among the live rows; a dropped
+            # row between two live ones always lies in another interval
+            live = live[valid_length[live] >= k]
+            if len(live) == 0:
+                break
+            starts = lcp[live] < k
+            starts[0] = True
+            starts[1:] |= np.diff(live) != 1
+            group = np.cumsum(starts) - 1
+            
+            # Distinct (interval, sequence) pairs give the occurrence sets
+            pairs = np.unique(group * n_seqs + owner[live])
+            pair_group = pairs // n_seqs
+            counts = np.bincount(pair_group)
+            
+            shared = np.flatnonzero(counts >= self.min_occurrences)
+            if len(shared) == 0:
+                break
+            
+            # OR each sequence bit into the bitset words of its interval
+            row_of = np.full(len(counts), -1)
+            row_of[shared] = np.arange(len(shared))
+            pair_row = row_of[pair_group]
+            hit = pair_row >= 0
+            sid = (pairs % n_seqs)[hit].astype(np.uint64)
+            words = np.zeros((len(shared), n_words), dtype=np.uint64)
+            np.bitwise_or.at(
+                words,
+                (pair_row[hit], (sid >> np.uint64(6)).astype(np.intp)),
+                np.uint64(1) << (sid & np.uint64(63))
+            )
+            
+            # Spell each interval's k-mer from the codes of its first suffix
+            first_row = live[np.searchsorted(group, shared)]
+            spans = sa[first_row][:, None] + np.arange(k)
+            raw = _BASE_LETTERS[codes[spans]].tobytes()
+            for i, row in enumerate(words):
+                motif_occurrences[raw[i * k:(i + 1) * k]] = int.from_bytes(row.tobytes(), 'little')
+            
+            live = live[counts[group] >= self.min_occurrences]
+        
+        return motif_occurrences
+    
+    def _scan_compiled(self):
+        """
+        Collect shared k-mers with the Numba kernel.
+        
+        Returns:
+        --------
+        dict : Dictionary mapping motif (ASCII bytes) to its occurrence bitset
+        """
+        motif_occurrences = {}
+        if not self.sequences or self.max_length < self.min_length:
+            return motif_occurrences
+        
+        encoded = list(self.encoded.values())
+        lengths = np.array([len(codes) for codes in encoded], dtype=np.int64)
+        enc_mat = np.full((len(encoded), max(lengths.max(), 1)), -1, dtype=np.int8)
+        for i, codes in enumerate(encoded):
+            enc_mat[i, :len(codes)] = codes.view(np.int8)
+        
+        # Seed the windows of the shortest length; each longer length only
+        # extends windows whose shorter k-mers were shared
+        window_codes = np.zeros(enc_mat.shape, dtype=np.uint64)
+        alive = np.zeros(enc_mat.shape, dtype=np.bool_)
+        _seed_windows(enc_mat, lengths, self.min_length, window_codes, alive)
+        
+        # Sequences are scanned in parallel chunks, one per Numba thread
+        n_chunks = get_num_threads()
+        for k in range(self.min_length, self.max_length + 1):
+            codes, bits = _scan_kmers(
+                enc_mat, lengths, k, self.min_occurrences, n_chunks,
+                window_codes, alive, k > self.min_length
+            )
+            if len(codes) == 0:
+                # No shared k-mer, so no longer one either
+                break
+            for motif, row in zip(_decode_kmers(codes, k), bits):
+                motif_occurrences[motif] = int.from_bytes(row.tobytes(), 'little')
+        
+        return motif_occurrences
+    
     def _remove_redundant_motifs(self, motif_dict):
         """
         Remove motifs that are substrings of longer motifs with identical occurrence.
         
         This helps reduce redundancy while keeping the most informative motifs.
+        motif_dict holds every shared k-mer in the length range, and any motif
+        between a short motif and a longer one containing it occurs in
+        exactly the same sequences. A motif is therefore redundant exactly
+        when a one-base extension of it has the same bitset, so only the
+        immediate prefix and suffix of each motif need checking (two
+        dictionary lookups instead of every substring).
         """
-        motifs_by_length = defaultdict(list)
-        for motif in motif_dict.keys():
-            motifs_by_length[len(motif)].append(motif)
-        
-        non_redundant = {}
-        
-        # Process from longest to shortest
-        for length in sorted(motifs_by_length.keys(), reverse=True):
-            for motif in motifs_by_length[length]:
-                seq_set = motif_dict[motif]
-                
-                # Check if this motif is redundant with any already added longer motif
-                is_redundant = False
-                for existing_motif, existing_set in non_redundant.items():
-                    # If this motif is a substring of an existing one
-                    # and they occur in the exact same sequences, it's redundant
-                    if motif in existing_motif and seq_set == existing_set:
-                        is_redundant = True
-                        break
-                
-                if not is_redundant:
-                    non_redundant[motif] = seq_set
+        redundant = set()
+        for longer, bitset in motif_dict.items():
+            if len(longer) <= self.min_length:
+                continue
+            for shorter in (longer[:-1], longer[1:]):
+                if motif_dict.get(shorter) == bitset:
+                    redundant.add(shorter)
+        
+        # Keep the longest-first order of the original filter
+        return {
+            motif: motif_dict[motif]
+            for motif in sorted(motif_dict, key=len, reverse=True)
+            if motif not in redundant
+        }
+    
+    def _decode_occurrences(self, bitsets):
+        """
+        Convert occurrence bitsets back into sorted, joined sequence IDs.
+        
+        Bitsets are decoded in batches as integer arrays: only the nonzero
+        64-bit words are unpacked, and the resulting sequence indices are
+        ordered by sorted-ID rank, so no per-bit Python loop is needed.
+        
+        Parameters:
+        -----------
+        bitsets : list
+            Occurrence bitsets (bit i set = sequence i contains the motif)
+            
+        Returns:
+        --------
+        list : Comma-separated sorted sequence IDs, one string per bitset
+        """
+        n_seqs = len(self.seq_id_list)
+        n_words = max(1, (n_seqs + 63) // 64)
+        by_id = sorted(range(n_seqs), key=self.seq_id_list.__getitem__)
+        sorted_ids = [self.seq_id_list[i] for i in by_id]
+        rank = np.empty(n_seqs, dtype=np.int64)
+        rank[by_id] = np.arange(n_seqs)
         
-        return non_redundant
+        # Keep each batch of packed words around 16 MB
+        batch = max(1, (1 << 21) // n_words)
+        id_lists = []
+        for first in range(0, len(bitsets), batch):
+            chunk = bitsets[first:first + batch]
+            words = np.frombuffer(
+                b''.join(bitset.to_bytes(8 * n_words, 'little') for bitset in chunk),
+                dtype='<u8'
+            ).reshape(len(chunk), n_words)
+            rows, word_cols = np.nonzero(words)
+            bits = np.unpackbits(
+                words[rows, word_cols].view(np.uint8).reshape(-1, 8),
+                axis=1, bitorder='little'
+            )
+            hit, bit = np.nonzero(bits)
+            rows = rows[hit]
+            ranks = rank[word_cols[hit] * 64 + bit]
+            order = np.lexsort((ranks, rows))
+            names = [sorted_ids[r] for r in ranks[order].tolist()]
+            start = 0
+            for end in np.cumsum(np.bincount(rows, minlength=len(chunk))).tolist():
+                id_lists.append(','.join(names[start:end]))
+                start = end
+        return id_lists
     
     def get_motif_positions(self, motif):
         """
@@ -156,15 +648,55 @@ class MotifAnalyzer:
         """
         positions = defaultdict(list)
         
-        for seq_id, sequence in self.sequences.items():
-            # Find all occurrences
-            start = 0
-            while True:
-                pos = sequence.find(motif, start)
-                if pos == -1:
-                    break
-                positions[seq_id].append(pos)
-                start = pos + 1
+        # Motifs the suffix array cannot answer are searched directly
+        codes = _encode_sequence(motif)
+        if (not self.min_length <= len(motif) <= self.max_length
+                or (codes == 255).any()):
+            haystacks, needle = search_space(motif, self.sequences, self.sequences_b)
+            for seq_id, sequence in haystacks.items():
+                start = 0
+                while True:
+                    pos = sequence.find(needle, start)
+                    if pos == -1:
+                        break
+                    positions[seq_id].append(pos)
+                    start = pos + 1
+            return positions
+        
+        # Occurrences form one contiguous block of the suffix array; narrow
+        # it word by word with binary searches on the packed sort keys
+        index = self._get_suffix_array()
+        lo, hi = 0, len(index['sa'])
+        for w, word in enumerate(index['words']):
+            first = 32 * w
+            if first >= len(motif):
+                break
+            word_bases = min(32, self.max_length - first)
+            part = codes[first:first + word_bases]
+            shift = np.uint64(2 * (word_bases - len(part)))
+            prefix = np.uint64(0)
+            for base in part:
+                prefix = (prefix << np.uint64(2)) | np.uint64(base)
+            low_key = prefix << shift
+            high_key = low_key | ((np.uint64(1) << shift) - np.uint64(1))
+            lo, hi = (lo + np.searchsorted(word[lo:hi], low_key, side='left'),
+                      lo + np.searchsorted(word[lo:hi], high_key, side='right'))
+        
+        # Drop suffixes that match only through zero padding
+        hits = np.arange(lo, hi)
+        hits = hits[index['valid_length'][hits] >= len(motif)]
+        owner = index['owner'][hits]
+        offset = index['offset'][hits]
+        
+        if len(hits) == 0:
+            return positions
+        
+        # Group by sequence, positions ascending
+        order = np.lexsort((offset, owner))
+        owner, offset = owner[order], offset[order]
+        breaks = np.flatnonzero(np.diff(owner)) + 1
+        for seq_owner, seq_offsets in zip(owner[np.r_[0, breaks]], np.split(offset, breaks)):
+            positions[self.seq_id_list[seq_owner]] = seq_offsets.tolist()
         
         return positions
     
@@ -183,12 +715,22 @@ class MotifAnalyzer:
         seq_ids = sorted(self.sequences.keys())
         motif_list = self.motifs['Motif'].tolist()
         
-        matrix = pd.DataFrame(0, index=seq_ids, columns=motif_list)
-        
+        # Unpack the occurrence bitsets from find_motifs into columns
+        n_bytes = (len(self.seq_id_list) + 7) // 8
+        bitsets = []
         for motif in motif_list:
-            for seq_id, sequence in self.sequences.items():
-                if motif in sequence:
-                    matrix.loc[seq_id, motif] = 1
+            bitset = self._occurrences.get(motif)
+            if bitset is None:
+                haystacks, needle = search_space(motif, self.sequences, self.sequences_b)
+                bitset = sum(1 << i for i, sequence in enumerate(haystacks.values())
+                             if needle in sequence)
+            bitsets.append(bitset.to_bytes(n_bytes, 'little'))
+        
+        packed = np.frombuffer(b''.join(bitsets), dtype=np.uint8).reshape(len(motif_list), n_bytes)
+        present = np.unpackbits(packed, axis=1, count=len(self.seq_id_list), bitorder='little')
+        
+        rows = [self.sid_of[seq_id] for seq_id in seq_ids]
+        matrix = pd.DataFrame(np.ascontiguousarray(present.T[rows]), index=seq_ids, columns=motif_list)
         
         return matrix
     
@@ -209,18 +751,23 @@ class MotifAnalyzer:
             return ""
         
         # Align sequences (simple approach - assumes similar length)
-        max_len = max(len(seq) for seq in sequences_subset)
-        
-        consensus = []
-        for pos in range(max_len):
-            bases = []
-            for seq in sequences_subset:
-                if pos < len(seq):
-                    bases.append(seq[pos])
-            
-            if bases:
-                # Most common base at this position
-                counter = Counter(bases)
-                consensus.append(counter.most_common(1)[0][0])
+        lengths = np.array([len(seq) for seq in sequences_subset])
+        max_len = lengths.max()
+        
+        # Byte matrix with a mask of the positions each sequence covers
+        encoded = np.zeros((len(sequences_subset), max_len), dtype=np.uint8)
+        for i, seq in enumerate(sequences_subset):
+            encoded[i, :len(seq)] = np.frombuffer(seq.encode('ascii', 'replace'), dtype=np.uint8)
+        covered = np.arange(max_len) < lengths[:, None]
+        
+        # Per-position counts of every byte value
+        rows, cols = np.nonzero(covered)
+        counts = np.zeros((max_len, 256), dtype=np.int64)
+        np.add.at(counts, (cols, encoded[rows, cols]), 1)
+        
+        # Most common base at each position; ties go to the base seen first
+        columns = np.arange(max_len)
+        is_best = covered & (counts[columns, encoded] == counts.max(axis=1))
+        consensus = encoded[is_best.argmax(axis=0), columns]
         
-        return ''.join(consensus)
+        return consensus.tobytes().decode('ascii')
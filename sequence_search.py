@@ -0,0 +1,48 @@
+"""
+Sequence Search Module
+Shared helpers for substring searches over ASCII-encoded sequences
+"""
+
+
+def encode_sequences(sequences):
+    """
+    ASCII bytes of each sequence, for fast substring searches.
+    
+    Non-ASCII characters become '?', so every character stays one byte and
+    positions are the same as in the original strings.
+    
+    Parameters:
+    -----------
+    sequences : dict
+        Dictionary of {sequence_id: sequence}
+    
+    Returns:
+    --------
+    dict : Dictionary of {sequence_id: bytes}
+    """
+    return {seq_id: sequence.encode('ascii', 'replace') for seq_id, sequence in sequences.items()}
+
+
+def search_space(motif, sequences, sequence_bytes):
+    """
+    Pick the sequences and needle for a direct substring search.
+    
+    The ASCII bytes are used whenever that is exact, i.e. unless the motif
+    itself contains non-ASCII characters or '?'.
+    
+    Parameters:
+    -----------
+    motif : str
+        The motif to search for
+    sequences : dict or list
+        The sequences as str
+    sequence_bytes : dict or list
+        The same sequences as ASCII bytes (see encode_sequences)
+    
+    Returns:
+    --------
+    tuple : (sequences or sequence_bytes, motif as str or bytes)
+    """
+    if motif.isascii() and '?' not in motif:
+        return sequence_bytes, motif.encode('ascii')
+    return sequences, motif
@@ -3,10 +3,23 @@ Statistical Analysis Module
 Calculates p-values and FDR for motif enrichment
 """
 
+from collections import defaultdict
 import numpy as np
 import pandas as pd
-from scipy.stats import binom
-from statsmodels.stats.multitest import multipletests
+from scipy.stats import binom, false_discovery_control
+
+from sequence_search import encode_sequences, search_space
+
+# joblib is optional; without it permutation chunks run one after another
+try:
+    from joblib import Parallel, delayed
+    JOBLIB_AVAILABLE = True
+except ImportError:
+    JOBLIB_AVAILABLE = False
+
+# Permutations per random stream in permutation_test. The chunking is fixed
+# so that a seeded result does not depend on n_jobs or the number of cores
+_PERMUTATION_CHUNK = 100
 
 
 class StatisticalAnalyzer:
@@ -29,11 +42,19 @@ class StatisticalAnalyzer:
         """
         self.motif_df = motif_df.copy() if motif_df is not None else pd.DataFrame()
         self.sequences = sequences
+        # ASCII bytes of each sequence (non-ASCII characters become '?')
+        self._seq_bytes = encode_sequences(sequences)
         self.n_sequences = len(sequences)
         self.random_region_length = random_region_length
         
         # Base probabilities (assume equal)
         self.base_prob = 0.25
+        
+        # Binomial tail p-values by (motif length, observed count)
+        self._sf_cache = {}
+        
+        # Chance of a motif occurring in a sequence, indexed by motif length
+        self._p_by_length = np.empty(0)
     
     def calculate_motif_probability(self, motif_length):
         """
@@ -43,14 +64,14 @@ class StatisticalAnalyzer:
         
         Parameters:
         -----------
-        motif_length : int
-            Length of the motif
+        motif_length : int or array-like
+            Length of the motif, or an array of lengths
             
         Returns:
         --------
-        float : Probability of the motif occurring at any position
+        float or np.ndarray : Probability of the motif occurring at any position
         """
-        return self.base_prob ** motif_length
+        return self.base_prob ** np.asarray(motif_length)
     
     def calculate_positions_per_sequence(self, motif_length):
         """
@@ -58,14 +79,39 @@ class StatisticalAnalyzer:
         
         Parameters:
         -----------
-        motif_length : int
-            Length of the motif
+        motif_length : int or array-like
+            Length of the motif, or an array of lengths
             
         Returns:
         --------
-        int : Number of possible starting positions
+        int or np.ndarray : Number of possible starting positions
         """
-        return max(1, self.random_region_length - motif_length + 1)
+        return np.maximum(1, self.random_region_length - np.asarray(motif_length) + 1)
+    
+    def _probability_in_sequence(self, motif_length, p_motif=None):
+        """
+        Probability that a motif of the given length occurs at least once in
+        a sequence, for a scalar or an array of lengths.
+        
+        p_motif is the per-position motif probability, by default that of
+        equal base frequencies (see calculate_motif_probability). In that
+        case the result depends on the length alone, so it is memoized in
+        a table by length, grown to the longest length asked for.
+        P(at least once) = 1 - (1-p)^n, evaluated as -expm1(n * log1p(-p))
+        so that tiny p does not lose precision.
+        """
+        motif_length = np.asarray(motif_length, dtype=np.int64)
+        if p_motif is None:
+            if motif_length.size and motif_length.max() >= len(self._p_by_length):
+                lengths = np.arange(motif_length.max() + 1)
+                with np.errstate(divide='ignore'):  # length 0 gives exactly 1
+                    self._p_by_length = self._probability_in_sequence(
+                        lengths, self.calculate_motif_probability(lengths)
+                    )
+            return self._p_by_length[motif_length]
+        
+        n_positions = self.calculate_positions_per_sequence(motif_length)
+        return -np.expm1(n_positions * np.log1p(-p_motif))
     
     def binomial_test(self, motif_length, observed_count):
         """
@@ -85,21 +131,32 @@ class StatisticalAnalyzer:
         --------
         float : p-value
         """
-        # Probability that a specific motif appears at any position
-        p_motif = self.calculate_motif_probability(motif_length)
-        
-        # Number of positions to check per sequence
-        n_positions = self.calculate_positions_per_sequence(motif_length)
-        
-        # Probability that the motif appears at least once in a sequence
-        # P(at least once) = 1 - P(never) = 1 - (1-p)^n
-        p_in_sequence = 1 - (1 - p_motif) ** n_positions
+        return self._binomial_sf([motif_length], [observed_count])[0]
+    
+    def _binomial_sf(self, motif_lengths, observed_counts):
+        """
+        Binomial test p-values for arrays of motif lengths and counts.
         
-        # Binomial test: out of n_sequences, how many contain the motif?
-        # P(X >= observed_count) where X ~ Binomial(n_sequences, p_in_sequence)
-        p_value = binom.sf(observed_count - 1, self.n_sequences, p_in_sequence)
+        p-values depend only on the (length, count) pair, and motif tables
+        repeat a few of them many times, so each distinct pair is evaluated
+        once and kept in self._sf_cache for later calls.
+        """
+        pairs = np.stack([np.asarray(motif_lengths, dtype=np.int64),
+                          np.asarray(observed_counts, dtype=np.int64)])
+        unique_pairs, inverse = np.unique(pairs, axis=1, return_inverse=True)
+        keys = list(map(tuple, unique_pairs.T.tolist()))
+        
+        missing = np.array([key for key in keys if key not in self._sf_cache], dtype=np.int64)
+        if len(missing) > 0:
+            # Probability that the motif appears at least once in a sequence
+            p_in_sequence = self._probability_in_sequence(missing[:, 0])
+            
+            # Binomial test: out of n_sequences, how many contain the motif?
+            # P(X >= observed_count) where X ~ Binomial(n_sequences, p_in_sequence)
+            p_values = binom.sf(missing[:, 1] - 1, self.n_sequences, p_in_sequence)
+            self._sf_cache.update(zip(map(tuple, missing.tolist()), p_values))
         
-        return p_value
+        return np.array([self._sf_cache[key] for key in keys])[inverse.ravel()]
     
     def calculate_enrichment(self, fdr_threshold=0.05):
         """
@@ -119,32 +176,16 @@ class StatisticalAnalyzer:
         if len(self.motif_df) == 0:
             return self.motif_df
         
-        # Calculate p-values for each motif
-        p_values = []
-        expected_counts = []
-        fold_enrichments = []
+        # Binomial test for all motifs at once
+        lengths = self.motif_df['Length'].to_numpy()
+        counts = self.motif_df['Count'].to_numpy()
+        p_in_sequence = self._probability_in_sequence(lengths)
+        p_values = self._binomial_sf(lengths, counts)
         
-        for idx, row in self.motif_df.iterrows():
-            motif_length = row['Length']
-            observed_count = row['Count']
-            
-            # P-value from binomial test
-            p_val = self.binomial_test(motif_length, observed_count)
-            p_values.append(p_val)
-            
-            # Calculate expected count
-            p_motif = self.calculate_motif_probability(motif_length)
-            n_positions = self.calculate_positions_per_sequence(motif_length)
-            p_in_sequence = 1 - (1 - p_motif) ** n_positions
-            expected = p_in_sequence * self.n_sequences
-            expected_counts.append(expected)
-            
-            # Fold enrichment
-            if expected > 0:
-                fold_enrichment = observed_count / expected
-            else:
-                fold_enrichment = np.inf
-            fold_enrichments.append(fold_enrichment)
+        # Expected count and fold enrichment
+        expected_counts = p_in_sequence * self.n_sequences
+        with np.errstate(divide='ignore'):
+            fold_enrichments = np.where(expected_counts > 0, counts / expected_counts, np.inf)
         
         # Add to DataFrame
         self.motif_df['Expected_Count'] = expected_counts
@@ -152,36 +193,32 @@ class StatisticalAnalyzer:
         self.motif_df['P_value'] = p_values
         
         # FDR correction (Benjamini-Hochberg)
-        if len(p_values) > 0:
-            reject, fdr_values, _, _ = multipletests(
-                p_values, 
-                alpha=fdr_threshold, 
-                method='fdr_bh'
-            )
-            self.motif_df['FDR'] = fdr_values
-            self.motif_df['Significant'] = reject
-        else:
-            self.motif_df['FDR'] = []
-            self.motif_df['Significant'] = []
-        
-        # Sort by FDR
-        self.motif_df = self.motif_df.sort_values('FDR').reset_index(drop=True)
+        fdr_values = false_discovery_control(p_values, method='bh')
+        self.motif_df['FDR'] = fdr_values
+        self.motif_df['Significant'] = fdr_values <= fdr_threshold
         
-        # Reorder columns for better readability
+        # Sort by FDR and reorder columns for better readability; selecting
+        # the columns by label raises KeyError for any that are missing
         column_order = [
             'Motif', 'Length', 'Count', 'Expected_Count', 
             'Fold_Enrichment', 'Frequency', 'P_value', 'FDR', 
             'Significant', 'Sequences'
         ]
-        self.motif_df = self.motif_df[column_order]
+        order = np.argsort(fdr_values)
+        self.motif_df = self.motif_df.take(order)[column_order].reset_index(drop=True)
         
         return self.motif_df
     
-    def permutation_test(self, motif, n_permutations=1000):
+    def permutation_test(self, motif, n_permutations=1000, random_state=None, n_jobs=1):
         """
         Perform permutation test for a specific motif.
         
         This is more computationally intensive but makes fewer assumptions.
+        Every sequence is shuffled independently in each permutation.
+        Permutations are drawn in fixed chunks with their own random
+        streams, so with n_jobs other than 1 (and joblib installed) the
+        chunks run on a thread pool; the NumPy work releases the GIL. A
+        given random_state gives the same p-value for any n_jobs.
         
         Parameters:
         -----------
@@ -189,36 +226,101 @@ class StatisticalAnalyzer:
             The motif sequence to test
         n_permutations : int
             Number of permutations (default: 1000)
+        random_state : int, optional
+            Seed for the shuffles (default: None)
+        n_jobs : int
+            Number of parallel workers, -1 for all cores (default: 1)
             
         Returns:
         --------
         float : Empirical p-value
         """
+        motif_bytes = motif.encode('ascii', 'replace')
+        
         # Count observed occurrences
-        observed = sum(1 for seq in self.sequences.values() if motif in seq)
-        
-        # Generate null distribution
-        null_counts = []
-        for _ in range(n_permutations):
-            # Shuffle each sequence
-            permuted_count = 0
-            for seq in self.sequences.values():
-                # Shuffle sequence
-                seq_list = list(seq)
-                np.random.shuffle(seq_list)
-                permuted_seq = ''.join(seq_list)
-                
-                # Check for motif
-                if motif in permuted_seq:
-                    permuted_count += 1
-            
-            null_counts.append(permuted_count)
+        haystacks, needle = search_space(motif, self.sequences, self._seq_bytes)
+        observed = sum(1 for seq in haystacks.values() if needle in seq)
+        
+        motif_codes = np.frombuffer(motif_bytes, dtype=np.uint8)
+        
+        # Sequences of equal length are shuffled together as one matrix;
+        # sequences too short to ever contain the motif are left out
+        by_length = defaultdict(list)
+        for seq in self._seq_bytes.values():
+            if len(seq) >= len(motif_bytes):
+                by_length[len(seq)].append(np.frombuffer(seq, dtype=np.uint8))
+        groups = [np.stack(group) for group in by_length.values()]
+        
+        # Generate null distribution, one independent random stream per chunk;
+        # n_jobs only decides how the chunks are spread over workers
+        n_chunks = max(1, -(-n_permutations // _PERMUTATION_CHUNK))
+        chunk_sizes = np.diff(np.linspace(0, n_permutations, n_chunks + 1).astype(int))
+        seeds = np.random.SeedSequence(random_state).spawn(n_chunks)
+        
+        if JOBLIB_AVAILABLE and n_jobs != 1 and n_chunks > 1:
+            parts = Parallel(n_jobs=n_jobs, prefer='threads')(
+                delayed(self._permute_chunk)(motif_codes, groups, size, seed)
+                for size, seed in zip(chunk_sizes, seeds)
+            )
+        else:
+            parts = [
+                self._permute_chunk(motif_codes, groups, size, seed)
+                for size, seed in zip(chunk_sizes, seeds)
+            ]
+        null_counts = np.concatenate(parts)
         
         # Calculate p-value
-        p_value = (np.sum(np.array(null_counts) >= observed) + 1) / (n_permutations + 1)
+        p_value = (np.sum(null_counts >= observed) + 1) / (n_permutations + 1)
         
         return p_value
     
+    def _permute_chunk(self, motif_codes, groups, n_permutations, seed):
+        """
+        Count the sequences containing the motif in each of n_permutations
+        shuffles.
+        
+        Shuffles are drawn in batches by tagging every base with a random
+        56-bit key in the high bits of a uint64 and sorting the rows in
+        place, so the low byte comes out shuffled without an index array.
+        The motif is then matched against all shuffled sequences at once,
+        one motif position at a time over the windows of their bytes.
+        
+        Parameters:
+        -----------
+        motif_codes : numpy.ndarray
+            Motif bytes as uint8
+        groups : list
+            uint8 matrices of equal-length sequences (one row per sequence)
+        n_permutations : int
+            Number of permutations in this chunk
+        seed : numpy.random.SeedSequence
+            Seed of this chunk's random stream
+            
+        Returns:
+        --------
+        numpy.ndarray : Number of matching sequences per permutation
+        """
+        rng = np.random.default_rng(seed)
+        null_counts = np.zeros(n_permutations, dtype=np.int64)
+        for seqs in groups:
+            # Keep each batch of shuffles around 2M bases
+            batch = max(1, (1 << 21) // max(1, seqs.size))
+            n_windows = seqs.shape[1] - len(motif_codes) + 1
+            for first in range(0, n_permutations, batch):
+                n_batch = min(batch, n_permutations - first)
+                keys = rng.integers(0, 1 << 56, size=(n_batch,) + seqs.shape, dtype=np.uint64)
+                keys <<= np.uint64(8)
+                keys |= seqs
+                keys.sort(axis=-1)
+                permuted = keys.astype(np.uint8)
+                
+                # Window i matches if every motif base j equals base i + j
+                match = np.ones((n_batch, len(seqs), n_windows), dtype=bool)
+                for j, code in enumerate(motif_codes):
+                    match &= permuted[:, :, j:j + n_windows] == code
+                null_counts[first:first + n_batch] += match.any(axis=-1).sum(axis=1)
+        return null_counts
+    
     def calculate_gc_content(self, sequence):
         """
         Calculate GC content of a sequence.
@@ -235,8 +337,33 @@ class StatisticalAnalyzer:
         if len(sequence) == 0:
             return 0.0
         
-        gc_count = sequence.count('G') + sequence.count('C')
-        return gc_count / len(sequence)
+        # One counting pass over the bytes instead of two str.count scans
+        base_counts = np.bincount(
+            np.frombuffer(sequence.encode('ascii', 'replace'), dtype=np.uint8),
+            minlength=256
+        )
+        gc_count = base_counts[ord('G')] + base_counts[ord('C')]
+        return float(gc_count / len(sequence))
+    
+    def _gc_contents(self):
+        """
+        GC content of every sequence, computed over one concatenated buffer.
+        
+        Returns:
+        --------
+        numpy.ndarray : GC content (0-1) per sequence, 0 for empty sequences
+        """
+        seqs = list(self.sequences.values())
+        lengths = np.fromiter((len(seq) for seq in seqs), dtype=np.int64, count=len(seqs))
+        buf = np.frombuffer(''.join(seqs).encode('ascii', 'replace'), dtype=np.uint8)
+        
+        # GC count per sequence as differences of a running total
+        is_gc = (buf == ord('G')) | (buf == ord('C'))
+        totals = np.concatenate(([0], np.cumsum(is_gc)))
+        ends = np.cumsum(lengths)
+        gc_counts = totals[ends] - totals[ends - lengths]
+        with np.errstate(invalid='ignore'):
+            return np.where(lengths > 0, gc_counts / np.maximum(lengths, 1), 0.0)
     
     def adjust_for_gc_bias(self):
         """
@@ -246,9 +373,7 @@ class StatisticalAnalyzer:
         non-uniform base composition.
         """
         # Calculate average GC content
-        gc_contents = [self.calculate_gc_content(seq) 
-                      for seq in self.sequences.values()]
-        avg_gc = np.mean(gc_contents)
+        avg_gc = np.mean(self._gc_contents())
         
         # Adjust probabilities
         # If GC content is higher, G and C are more likely
@@ -257,36 +382,28 @@ class StatisticalAnalyzer:
         
         # Recalculate p-values with adjusted probabilities
         # This is a simplified adjustment - more sophisticated methods exist
-        adjusted_p_values = []
+        if len(self.motif_df) == 0:
+            self.motif_df['P_value_GC_adjusted'] = []
+            return self.motif_df
         
-        for idx, row in self.motif_df.iterrows():
-            motif = row['Motif']
-            observed_count = row['Count']
-            
-            # Calculate probability of this specific motif
-            p_motif = 1.0
-            for base in motif:
-                if base in 'GC':
-                    p_motif *= p_gc
-                else:
-                    p_motif *= p_at
-            
-            # Rest of calculation is same as binomial_test
-            n_positions = self.calculate_positions_per_sequence(len(motif))
-            p_in_sequence = 1 - (1 - p_motif) ** n_positions
-            p_value = binom.sf(observed_count - 1, self.n_sequences, p_in_sequence)
-            
-            adjusted_p_values.append(p_value)
+        # Probability of each specific motif: one factor per base, with the
+        # padding past the end of shorter motifs contributing 1.0
+        motifs = [motif.encode('ascii', 'replace') for motif in self.motif_df['Motif']]
+        width = max(1, max(len(motif) for motif in motifs))
+        bases = np.array(motifs, dtype=f'S{width}').view(np.uint8).reshape(len(motifs), width)
+        factors = np.where((bases == ord('G')) | (bases == ord('C')), p_gc, p_at)
+        p_motif = np.prod(np.where(bases == 0, 1.0, factors), axis=1)
+        
+        # Rest of calculation is same as binomial_test
+        lengths = np.fromiter((len(motif) for motif in motifs), dtype=np.int64, count=len(motifs))
+        p_in_sequence = self._probability_in_sequence(lengths, p_motif)
+        counts = self.motif_df['Count'].to_numpy()
+        adjusted_p_values = binom.sf(counts - 1, self.n_sequences, p_in_sequence)
         
         self.motif_df['P_value_GC_adjusted'] = adjusted_p_values
         
         # Recalculate FDR
         if len(adjusted_p_values) > 0:
-            reject, fdr_values, _, _ = multipletests(
-                adjusted_p_values, 
-                alpha=0.05, 
-                method='fdr_bh'
-            )
-            self.motif_df['FDR_GC_adjusted'] = fdr_values
+            self.motif_df['FDR_GC_adjusted'] = false_discovery_control(adjusted_p_values, method='bh')
         
         return self.motif_df
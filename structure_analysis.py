@@ -6,7 +6,9 @@ Predicts secondary structures using ViennaRNA Python bindings
 import subprocess
 import tempfile
 import os
+import multiprocessing
 from collections import defaultdict
+import numpy as np
 
 # Try to import ViennaRNA
 try:
@@ -17,6 +19,144 @@ except ImportError:
     print("Warning: ViennaRNA Python package not available.")
     print("Structure prediction will use a simple algorithm.")
 
+# Numba is optional; without it the fallback folding runs as plain Python
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the function as is."""
+        return lambda func: func
+
+# Below this many sequences, starting worker processes costs more than it
+# saves: a pool takes ~10-15 ms to start with fork and ~0.6-0.75 s with
+# spawn/forkserver (each worker re-imports NumPy and Numba), against ~1-2 ms
+# per ViennaRNA fold of a ~110 nt aptamer
+_MIN_PARALLEL_SEQUENCES = 500
+
+# DNA to RNA translation table (T -> U)
+_DNA_TO_RNA = bytes.maketrans(b'Tt', b'Uu')
+
+# Base pairing rules for the simple fallback algorithm: Watson-Crick pairs
+# plus G-U wobble, in both orientations
+_PAIRS = ('AU', 'UA', 'GC', 'CG', 'GU', 'UG')
+
+# Map ASCII bytes to base codes A/C/G/U = 0..3; anything else is 4 and never pairs
+_RNA_CODES = np.full(256, 4, dtype=np.uint8)
+_RNA_CODES[np.frombuffer(b'ACGU', dtype=np.uint8)] = np.arange(4, dtype=np.uint8)
+
+# can_pair[code of k, code of j] for the fill loop
+_CAN_PAIR = np.zeros((5, 5), dtype=np.bool_)
+for _k, _j in _PAIRS:
+    _CAN_PAIR[_RNA_CODES[ord(_k)], _RNA_CODES[ord(_j)]] = True
+
+
+def _runs(mask):
+    """Start index and length of every run of True in a boolean array."""
+    edges = np.diff(np.r_[False, mask, False].astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    return starts, np.flatnonzero(edges == -1) - starts
+
+
+@njit(cache=True)
+def _nussinov_fill(seq_codes, can_pair, trace):
+    """
+    Fill the Nussinov DP table and the zero-initialised trace table in place.
+    
+    dp[i, j] is the maximum number of pairs in seq[i..j]. trace[i, j] is -1
+    when j is left unpaired, k + 1 when j pairs with k, and 0 for cells
+    that are never filled.
+    """
+    n = len(seq_codes)
+    dp = np.zeros((n, n), dtype=np.int32)
+    
+    for length in range(2, n + 1):
+        for i in range(n - length + 1):
+            j = i + length - 1
+            
+            # Case 1: j unpaired
+            dp[i, j] = dp[i, j - 1]
+            trace[i, j] = -1
+            
+            # Case 2: j pairs with some k
+            for k in range(i, j):
+                if can_pair[seq_codes[k], seq_codes[j]]:
+                    score = 1
+                    if k > i:
+                        score += dp[i, k - 1]
+                    if k + 1 < j:
+                        score += dp[k + 1, j - 1]
+                    
+                    if score > dp[i, j]:
+                        dp[i, j] = score
+                        trace[i, j] = k + 1
+    
+    return dp
+
+
+@njit(cache=True)
+def _nussinov_traceback(trace):
+    """
+    Dot-bracket structure (as ASCII codes) encoded by a filled trace table.
+    
+    Intervals still to visit are kept on an explicit stack. They are
+    disjoint and non-empty, so at most n are pending at once.
+    """
+    n = trace.shape[0]
+    structure = np.full(n, ord('.'), dtype=np.uint8)
+    stack_i = np.empty(n + 1, dtype=np.int64)
+    stack_j = np.empty(n + 1, dtype=np.int64)
+    stack_i[0] = 0
+    stack_j[0] = n - 1
+    top = 1
+    
+    while top > 0:
+        top -= 1
+        i = stack_i[top]
+        j = stack_j[top]
+        if i >= j or trace[i, j] == 0:
+            continue
+        
+        k = trace[i, j] - 1
+        if k < 0:
+            stack_i[top] = i
+            stack_j[top] = j - 1
+            top += 1
+        else:
+            structure[k] = ord('(')
+            structure[j] = ord(')')
+            if k > i:
+                stack_i[top] = i
+                stack_j[top] = k - 1
+                top += 1
+            if k + 1 < j:
+                stack_i[top] = k + 1
+                stack_j[top] = j - 1
+                top += 1
+    
+    return structure
+
+
+def _to_rna(sequence):
+    """Convert DNA to RNA (T -> U) with one byte-level translate."""
+    if sequence.isascii():
+        return sequence.encode('ascii').translate(_DNA_TO_RNA).decode('ascii')
+    return sequence.replace('T', 'U').replace('t', 'u')
+
+
+def _available_cpus():
+    """Number of CPUs this process may run on (affinity/cpuset aware)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _fold_worker(seq_id, rna_sequence, temperature):
+    """Predict one structure in a worker process (top-level so it pickles)."""
+    return StructureAnalyzer(temperature=temperature)._predict_or_error(rna_sequence, seq_id)
+
 
 class StructureAnalyzer:
     """
@@ -43,7 +183,7 @@ class StructureAnalyzer:
         Parameters:
         -----------
         rna_sequence : str
-            RNA sequence (with U, not T)
+            RNA sequence; any T is converted to U before folding
         seq_id : str
             Sequence identifier
             
@@ -51,6 +191,9 @@ class StructureAnalyzer:
         --------
         dict : Dictionary with structure, MFE, and other information
         """
+        if 'T' in rna_sequence or 't' in rna_sequence:
+            rna_sequence = _to_rna(rna_sequence)
+        
         if self.vienna_available:
             return self._predict_with_vienna(rna_sequence, seq_id)
         else:
@@ -83,97 +226,73 @@ class StructureAnalyzer:
         """
         n = len(rna_sequence)
         
-        # Initialize DP table
-        dp = [[0] * n for _ in range(n)]
-        trace = [[None] * n for _ in range(n)]
-        
-        # Base pairing rules
-        pairs = {'A': 'U', 'U': 'A', 'G': 'C', 'C': 'G', 'G': 'U', 'U': 'G'}
-        
-        # Fill DP table
-        for length in range(2, n + 1):
-            for i in range(n - length + 1):
-                j = i + length - 1
-                
-                # Case 1: j unpaired
-                dp[i][j] = dp[i][j-1]
-                trace[i][j] = (i, j-1, 'unpaired')
-                
-                # Case 2: j pairs with some k
-                for k in range(i, j):
-                    if (rna_sequence[k] in pairs and 
-                        pairs[rna_sequence[k]] == rna_sequence[j]):
-                        score = 1
-                        if k > i:
-                            score += dp[i][k-1]
-                        if k + 1 < j:
-                            score += dp[k+1][j-1]
-                        
-                        if score > dp[i][j]:
-                            dp[i][j] = score
-                            trace[i][j] = (k, j, 'paired')
+        # Fill DP table on base codes (compiled when Numba is available)
+        seq_codes = _RNA_CODES[np.frombuffer(rna_sequence.encode('ascii', 'replace'), dtype=np.uint8)]
+        # Traceback decisions only need the partner index, so int16 suffices
+        # for any sequence short enough to fold this way
+        trace = np.zeros((n, n), dtype=np.int16 if n < np.iinfo(np.int16).max else np.int32)
+        dp = _nussinov_fill(seq_codes, _CAN_PAIR, trace)
         
         # Traceback to get structure
-        structure = ['.'] * n
-        self._traceback_simple(trace, structure, 0, n-1, rna_sequence, pairs)
+        structure = _nussinov_traceback(trace).tobytes().decode('ascii')
         
         # Estimate MFE (very rough approximation)
-        mfe = -dp[0][n-1] * 2.5  # Rough estimate
+        mfe = -int(dp[0, n-1]) * 2.5  # Rough estimate
         
         return {
             'sequence': rna_sequence,
-            'structure': ''.join(structure),
+            'structure': structure,
             'mfe': mfe,
             'seq_id': seq_id
         }
     
-    def _traceback_simple(self, trace, structure, i, j, seq, pairs):
-        """Traceback for simple structure prediction."""
-        if i >= j or trace[i][j] is None:
-            return
-        
-        k, j_end, pair_type = trace[i][j]
-        
-        if pair_type == 'unpaired':
-            self._traceback_simple(trace, structure, i, j-1, seq, pairs)
-        elif pair_type == 'paired':
-            structure[k] = '('
-            structure[j] = ')'
-            if k > i:
-                self._traceback_simple(trace, structure, i, k-1, seq, pairs)
-            if k + 1 < j:
-                self._traceback_simple(trace, structure, k+1, j-1, seq, pairs)
-    
-    def predict_structures(self, rna_sequences):
+    def predict_structures(self, rna_sequences, n_jobs=1):
         """
         Predict structures for multiple RNA sequences.
         
+        ViennaRNA folds are independent and CPU-bound, so with n_jobs other
+        than 1 large batches are spread over worker processes. This starts
+        a multiprocessing pool, so only ask for it from a process's main
+        thread (not, e.g., from a Streamlit script run).
+        
         Parameters:
         -----------
         rna_sequences : dict
             Dictionary of {sequence_id: rna_sequence}
+        n_jobs : int
+            Number of worker processes, -1 for all available cores
+            (default: 1, fold in this process)
             
         Returns:
         --------
         dict : Dictionary of {sequence_id: structure_info}
         """
-        structures = {}
+        n_workers = _available_cpus() if n_jobs < 0 else n_jobs
+        if (self.vienna_available and n_workers > 1
+                and len(rna_sequences) >= _MIN_PARALLEL_SEQUENCES):
+            jobs = [(seq_id, rna_seq, self.temperature) for seq_id, rna_seq in rna_sequences.items()]
+            with multiprocessing.Pool(processes=n_workers) as pool:
+                results = pool.starmap(_fold_worker, jobs)
+            return {job[0]: result for job, result in zip(jobs, results)}
         
-        for seq_id, rna_seq in rna_sequences.items():
-            try:
-                structure_info = self.predict_structure(rna_seq, seq_id)
-                structures[seq_id] = structure_info
-            except Exception as e:
-                print(f"Error predicting structure for {seq_id}: {str(e)}")
-                structures[seq_id] = {
-                    'sequence': rna_seq,
-                    'structure': None,
-                    'mfe': None,
-                    'seq_id': seq_id,
-                    'error': str(e)
-                }
-        
-        return structures
+        return {
+            seq_id: self._predict_or_error(rna_seq, seq_id)
+            for seq_id, rna_seq in rna_sequences.items()
+        }
+    
+    def _predict_or_error(self, rna_sequence, seq_id):
+        """Predict one structure, recording any failure in the result."""
+        try:
+            return self.predict_structure(rna_sequence, seq_id)
+        except Exception as e:
+            print(f"Error predicting structure for {seq_id}: {str(e)}")
+            return {
+                'sequence': rna_sequence,
+                'structure': None,
+                'mfe': None,
+                'seq_id': seq_id,
+                'error': str(e)
+            }
     
     def find_structural_motifs(self, structures, min_occurrences=2):
         """
@@ -224,69 +343,60 @@ class StructureAnalyzer:
         return common_motifs
     
     def _extract_stems(self, structure, min_length=3):
-        """Extract stem regions (consecutive base pairs)."""
-        stems = []
-        current_stem = 0
-        
-        for char in structure:
-            if char == '(':
-                current_stem += 1
-            elif char == ')':
-                if current_stem >= min_length:
-                    stems.append(current_stem)
-                current_stem = 0
-            else:
-                if current_stem >= min_length:
-                    stems.append(current_stem)
-                current_stem = 0
-        
-        if current_stem >= min_length:
-            stems.append(current_stem)
+        """
+        Extract stem regions (consecutive base pairs).
         
-        return stems
+        A stem is a run of stacked pairs (i, j), (i+1, j-1), ... so a bulge
+        or loop on either side ends it. Brackets are matched without a
+        Python loop: at each nesting level openings and closings alternate,
+        so the n-th opening at a level pairs with the n-th closing there.
+        Unbalanced structures have no well-defined pairs and give no stems.
+        """
+        codes = np.frombuffer(structure.encode('ascii', 'replace'), dtype=np.uint8)
+        is_open = codes == ord('(')
+        is_close = codes == ord(')')
+        depth = np.cumsum(is_open.astype(np.int64) - is_close)
+        if not is_open.any() or depth[-1] != 0 or depth.min() < 0:
+            return []
+        
+        # Match brackets level by level
+        opens = np.flatnonzero(is_open)
+        closes = np.flatnonzero(is_close)
+        opens = opens[np.lexsort((opens, depth[opens]))]
+        closes = closes[np.lexsort((closes, depth[closes] + 1))]
+        
+        # Pairs in order of their opening bracket; a stem continues while
+        # both sides move one base inwards
+        order = np.argsort(opens)
+        pair_open, pair_close = opens[order], closes[order]
+        stacked = (np.diff(pair_open) == 1) & (np.diff(pair_close) == -1)
+        starts = np.flatnonzero(np.r_[True, ~stacked])
+        stems = np.diff(np.r_[starts, len(pair_open)])
+        
+        return stems[stems >= min_length].tolist()
     
     def _extract_loops(self, structure):
-        """Extract loop regions (unpaired bases within structure)."""
-        loops = []
-        in_loop = False
-        loop_size = 0
-        depth = 0
-        
-        for char in structure:
-            if char == '(':
-                depth += 1
-                if in_loop and loop_size > 0:
-                    loops.append(loop_size)
-                in_loop = False
-                loop_size = 0
-            elif char == ')':
-                depth -= 1
-                if in_loop and loop_size > 0:
-                    loops.append(loop_size)
-                in_loop = False
-                loop_size = 0
-            elif char == '.':
-                if depth > 0:  # Internal loop
-                    in_loop = True
-                    loop_size += 1
-        
-        return loops
+        """
+        Extract loop regions (unpaired bases within structure).
+        
+        Runs of '.' inside at least one pair count once the next bracket
+        closes them; characters other than brackets and dots are ignored.
+        """
+        codes = np.frombuffer(structure.encode('ascii', 'replace'), dtype=np.uint8)
+        codes = codes[np.isin(codes, np.frombuffer(b'().', dtype=np.uint8))]
+        depth = np.cumsum((codes == ord('(')).astype(np.int64) - (codes == ord(')')))
+        
+        starts, lengths = _runs((codes == ord('.')) & (depth > 0))
+        closed = starts + lengths < len(codes)
+        return lengths[closed].tolist()
     
     def _extract_bulges(self, structure):
         """Extract bulge regions (unpaired bases on one side of stem)."""
-        # Simplified bulge detection
-        bulges = []
-        unpaired = 0
-        
-        for i, char in enumerate(structure):
-            if char == '.':
-                unpaired += 1
-            else:
-                if unpaired > 0 and unpaired < 5:  # Small unpaired regions are bulges
-                    bulges.append(unpaired)
-                unpaired = 0
-        
-        return bulges
+        # Simplified bulge detection: small unpaired runs followed by a base pair
+        codes = np.frombuffer(structure.encode('ascii', 'replace'), dtype=np.uint8)
+        starts, lengths = _runs(codes == ord('.'))
+        bulges = (starts + lengths < len(codes)) & (lengths < 5)
+        return lengths[bulges].tolist()
     
     def calculate_structure_similarity(self, structure1, structure2):
         """
@@ -309,8 +419,10 @@ class StructureAnalyzer:
             structure1 = structure1[:min_len]
             structure2 = structure2[:min_len]
         
-        # Count matching positions
-        matches = sum(1 for a, b in zip(structure1, structure2) if a == b)
+        # Count matching positions with one array comparison over code points
+        codes1 = np.frombuffer(structure1.encode('utf-32-le'), dtype=np.uint32)
+        codes2 = np.frombuffer(structure2.encode('utf-32-le'), dtype=np.uint32)
+        matches = int(np.count_nonzero(codes1 == codes2))
         similarity = matches / len(structure1) if len(structure1) > 0 else 0
         
         return similarity
@@ -337,19 +449,22 @@ class StructureAnalyzer:
         
         # Find maximum length
         max_len = max(len(s) for s in struct_list)
+        if max_len == 0:
+            return ''
         
         # Pad structures to same length
         padded = [s + '.' * (max_len - len(s)) for s in struct_list]
         
-        # Consensus by majority vote at each position
-        consensus = []
-        for pos in range(max_len):
-            chars = [s[pos] for s in padded]
-            # Most common character at this position
-            most_common = max(set(chars), key=chars.count)
-            consensus.append(most_common)
+        # One row of code points per structure
+        chars = np.array(padded, dtype=f'U{max_len}').view(np.uint32).reshape(len(padded), max_len)
+        
+        # Consensus by majority vote at each position: count every symbol
+        # down the columns, ties going to the lowest code point
+        symbols = np.unique(chars)
+        counts = (chars[None, :, :] == symbols[:, None, None]).sum(axis=1)
+        consensus = symbols[counts.argmax(axis=0)]
         
-        return ''.join(consensus)
+        return ''.join(map(chr, consensus))
     
     def visualize_structure(self, structure_info, output_file=None):
         """
@@ -373,15 +488,24 @@ class StructureAnalyzer:
         if structure is None:
             return None
         
-        # Create temporary fasta file
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.fa') as f:
-            f.write(f">{seq_id}\n{sequence}\n{structure}\n")
-            temp_input = f.name
-        
         # Determine output file
         if output_file is None:
             output_file = f"{seq_id}_structure.svg"
         
+        # Draw in-process with the bindings when available
+        if VIENNA_AVAILABLE:
+            try:
+                RNA.svg_rna_plot(sequence, structure, output_file)
+                return output_file if os.path.exists(output_file) else None
+            except Exception as e:
+                print(f"Error visualizing structure: {str(e)}")
+                return None
+        
+        # Otherwise fall back to the RNAplot command-line tool
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.fa') as f:
+            f.write(f">{seq_id}\n{sequence}\n{structure}\n")
+            temp_input = f.name
+        
         try:
             # Run RNAplot to create visualization
             subprocess.run(
@@ -82,6 +82,63 @@ except Exception as e:
     print(f"❌ Visualization error: {e}")
     exit(1)
 
+# Test stem extraction
+print("\n6. Testing stem extraction...")
+try:
+    stem_cases = {
+        '(((...)))': [3],
+        '((((....))))..(((...)))': [4, 3],
+        # A bulge or loop on either strand ends a stem
+        '(((.((...)))))': [3],
+        '((((...))..))': [],
+        # Unbalanced structures have no well-defined pairs
+        '(((...))': [],
+        '))((': [],
+        '.....': [],
+    }
+    for structure, expected in stem_cases.items():
+        stems = structure_analyzer._extract_stems(structure)
+        assert stems == expected, f"{structure} gave stems {stems}, expected {expected}"
+    print(f"✅ Stems extracted correctly for {len(stem_cases)} structures")
+except Exception as e:
+    print(f"❌ Stem extraction error: {e}")
+    exit(1)
+
+# Test that both motif discovery engines agree
+print("\n7. Testing motif discovery engines...")
+try:
+    import motif_analysis
+    numba_available = motif_analysis.NUMBA_AVAILABLE
+    
+    # Numba k-mer counting when available, then the NumPy suffix array
+    engines = {}
+    for name, use_numba in [('Numba', numba_available), ('suffix array', False)]:
+        motif_analysis.NUMBA_AVAILABLE = use_numba
+        engine_analyzer = MotifAnalyzer(
+            test_sequences,
+            min_length=5,
+            max_length=10,
+            min_occurrences=2
+        )
+        engines[name] = (engine_analyzer, engine_analyzer.find_motifs())
+    motif_analysis.NUMBA_AVAILABLE = numba_available
+    
+    # Rows tied on count and length may come in either order
+    tables = [table.sort_values('Motif').reset_index(drop=True) for _, table in engines.values()]
+    assert tables[0].equals(tables[1]), "motif tables differ between engines"
+    
+    # Overlapping occurrences are all reported
+    expected_positions = {'Seq1': [1, 5, 9], 'Seq2': [5, 9, 13], 'Seq3': [6, 10, 14]}
+    for name, (engine_analyzer, _) in engines.items():
+        positions = dict(engine_analyzer.get_motif_positions('GCTAG'))
+        assert positions == expected_positions, f"{name}: GCTAG found at {positions}"
+    print(f"✅ Both engines found the same {len(tables[0])} motifs")
+    if not numba_available:
+        print("   ⚠️  Numba not available, only the suffix array was tested")
+except Exception as e:
+    print(f"❌ Motif engine comparison error: {e}")
+    exit(1)
+
 print("\n" + "=" * 50)
 print("✅ All tests passed!")
 print("\nReady to launch AptaMotif Analyzer!")
@@ -3,11 +3,132 @@ Visualization Module
 Creates heatmaps, sequence logos, and other visualizations
 """
 
+import re
+from collections import defaultdict
+from functools import lru_cache
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import ListedColormap
+from matplotlib.figure import Figure
 import seaborn as sns
-import numpy as npx
+import numpy as np
 import pandas as pd
-import logomaker
+
+from sequence_search import encode_sequences, search_space
+
+# pyahocorasick is optional; without it each motif is searched separately
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Heatmap colours, built once: light gray for 0, blue for 1
+_HEATMAP_CMAP = ListedColormap(['#f0f0f0', '#2E86AB'])
+
+# Row of each ASCII byte in the logo count matrix (A, C, G, T); 4 for others
+_LOGO_ROWS = np.full(256, 4, dtype=np.uint8)
+_LOGO_ROWS[np.frombuffer(b'ACGT', dtype=np.uint8)] = np.arange(4, dtype=np.uint8)
+
+
+# Logo windows needed before the Numba kernel is used: below this the NumPy
+# histogram takes a few ms at most, which does not repay importing Numba
+# (~0.5 s) or compiling the kernel on first use (~10 s)
+_NUMBA_MIN_SEGMENTS = 100_000
+
+
+@lru_cache(maxsize=None)
+def _numba_count_bases():
+    """Parallel base counting kernel, compiled on first call; None without Numba."""
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+    
+    @njit(cache=True, parallel=True)
+    def count_bases(segments, rows, n_chunks):
+        """
+        Count A/C/G/T at every column of a uint8 segment matrix.
+        
+        Rows are split into n_chunks blocks counted in parallel into their
+        own tables, which are summed at the end.
+        """
+        n_segments, n_cols = segments.shape
+        partial = np.zeros((n_chunks, 5, n_cols), dtype=np.int64)
+        for chunk in prange(n_chunks):
+            for i in range(chunk * n_segments // n_chunks, (chunk + 1) * n_segments // n_chunks):
+                for col in range(n_cols):
+                    partial[chunk, rows[segments[i, col]], col] += 1
+        return partial.sum(axis=0)[:4]
+    
+    return count_bases
+
+
+def _count_bases(segments):
+    """
+    Count A/C/G/T at every column of a uint8 segment matrix.
+    
+    Returns:
+    --------
+    np.ndarray : (4, n_cols) counts, rows in A, C, G, T order
+    """
+    n_cols = segments.shape[1]
+    if len(segments) >= _NUMBA_MIN_SEGMENTS:
+        kernel = _numba_count_bases()
+        if kernel is not None:
+            from numba import get_num_threads
+            return kernel(segments, _LOGO_ROWS, get_num_threads())
+    
+    # One histogram pass over (count row, column) cells, with everything
+    # but A/C/G/T falling into a fifth, dropped row
+    cells = (_LOGO_ROWS.astype(np.intp) * n_cols)[segments]
+    cells += np.arange(n_cols)
+    return np.bincount(cells.ravel(), minlength=5 * n_cols).reshape(5, n_cols)[:4]
+
+
+def _search_motif(motif, sequences, sequence_bytes):
+    """
+    Find every (seq_id, position) of one motif, overlapping occurrences
+    included, in sequence order.
+    """
+    haystacks, needle = search_space(motif, sequences, sequence_bytes)
+    
+    # Zero-width lookahead so that overlapping occurrences are all found
+    lookahead = b'(?=%s)' if isinstance(needle, bytes) else '(?=%s)'
+    pattern = re.compile(lookahead % re.escape(needle))
+    return [
+        (seq_id, match.start())
+        for seq_id, sequence in haystacks.items()
+        for match in pattern.finditer(sequence)
+    ]
+
+
+def _search_motifs(sequences, motifs):
+    """
+    Find every (seq_id, position) of several motifs.
+    
+    With pyahocorasick, all motifs are matched in one pass over each
+    sequence; otherwise each motif is searched on its own.
+    
+    Returns:
+    --------
+    dict : {motif: list of (seq_id, position)}, in sequence order
+    """
+    motifs = list(dict.fromkeys(motifs))
+    if not AHOCORASICK_AVAILABLE or not all(motifs):
+        sequence_bytes = encode_sequences(sequences)
+        return {motif: _search_motif(motif, sequences, sequence_bytes) for motif in motifs}
+    
+    automaton = ahocorasick.Automaton()
+    for motif in motifs:
+        automaton.add_word(motif, motif)
+    automaton.make_automaton()
+    
+    occurrences = defaultdict(list)
+    for seq_id, sequence in sequences.items():
+        for end, motif in automaton.iter(sequence):
+            occurrences[motif].append((seq_id, end - len(motif) + 1))
+    return {motif: occurrences[motif] for motif in motifs}
 
 
 class MotifVisualizer:
@@ -15,11 +136,123 @@ class MotifVisualizer:
     Creates visualizations for motif analysis results.
     """
     
+    # The plot style is global matplotlib state, so it is applied once per
+    # process rather than on every instantiation (e.g. each Streamlit rerun)
+    _style_set = False
+    
     def __init__(self):
         """Initialize the visualizer with default settings."""
         # Set style
-        sns.set_style("whitegrid")
-        plt.rcParams['figure.dpi'] = 100
+        if not MotifVisualizer._style_set:
+            sns.set_style("whitegrid")
+            plt.rcParams['figure.dpi'] = 100
+            MotifVisualizer._style_set = True
+        
+        # Motif occurrences shared between plots, see precompute()
+        self._occurrences = {}
+        self._occurrence_sequences = None
+        
+        # ASCII bytes of the last sequences dict searched, and the same
+        # bytes concatenated (built on first use, see _concatenated())
+        self._sequence_bytes = {}
+        self._bytes_sequences = None
+        self._buffer = None
+    
+    def precompute(self, sequences, motifs):
+        """
+        Search the given motifs once so that create_heatmap and
+        create_sequence_logo can reuse the occurrences.
+        
+        The results are used by later calls that pass the same sequences
+        dict (the same object); other motifs or sequences are searched as
+        usual.
+        
+        create_heatmap also keeps the occurrences it finds when it can search
+        all of its motifs in one pass, so this is only needed to cover other
+        motifs up front.
+        
+        Parameters:
+        -----------
+        sequences : dict
+            Dictionary of {sequence_id: sequence}
+        motifs : iterable of str
+            Motifs that will be plotted
+        """
+        self._store_occurrences(sequences, _search_motifs(sequences, motifs))
+    
+    def _store_occurrences(self, sequences, occurrences):
+        """Keep {motif: occurrences} found in the given sequences for reuse."""
+        if sequences is not self._occurrence_sequences:
+            self._occurrences = {}
+            self._occurrence_sequences = sequences
+        self._occurrences.update(occurrences)
+    
+    def _cached_occurrences(self, motif, sequences):
+        """Precomputed occurrences of a motif, or None if not available."""
+        if sequences is self._occurrence_sequences:
+            return self._occurrences.get(motif)
+        return None
+    
+    def _encoded(self, sequences):
+        """ASCII bytes of the sequences, reused while the same dict is passed."""
+        if sequences is not self._bytes_sequences:
+            self._sequence_bytes = encode_sequences(sequences)
+            self._bytes_sequences = sequences
+            self._buffer = None
+        return self._sequence_bytes
+    
+    def _concatenated(self, sequences):
+        """
+        All sequence bytes in one array, for slicing out logo windows.
+        
+        Returns:
+        --------
+        tuple : (uint8 buffer, start of each sequence, length of each
+                 sequence, {seq_id: index}); the buffer ends with one spare
+                 byte so that it is never empty
+        """
+        sequence_bytes = self._encoded(sequences)
+        if self._buffer is None:
+            lengths = np.fromiter((len(seq) for seq in sequence_bytes.values()),
+                                  dtype=np.int64, count=len(sequence_bytes))
+            starts = np.cumsum(lengths) - lengths
+            buffer = np.frombuffer(b''.join(sequence_bytes.values()) + b'N', dtype=np.uint8)
+            index_of = {seq_id: i for i, seq_id in enumerate(sequence_bytes)}
+            self._buffer = (buffer, starts, lengths, index_of)
+        return self._buffer
+    
+    def _make_fig(self, figsize):
+        """
+        Create a figure with a single axes that pyplot does not track.
+        
+        pyplot keeps every figure it creates alive until plt.close() is
+        called on it, so figures made on each Streamlit rerun would pile up.
+        These are freed as soon as the caller drops them (e.g. after
+        st.pyplot); callers that keep figures around own their lifetime.
+        The Agg canvas is attached up front: on the bare default canvas,
+        seaborn's tick layout renders at full size and needs gigabytes for
+        a tall heatmap.
+        """
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        return fig, fig.add_subplot()
+    
+    def _top_by_fdr(self, motif_df, n):
+        """
+        Rows with the n lowest FDRs, in FDR order (same as nsmallest).
+        
+        Uses partial selection rather than a full sort; ties at the cut-off
+        go to the earliest rows.
+        """
+        fdr_values = motif_df['FDR'].to_numpy()
+        n = min(n, len(fdr_values))
+        if n == 0:
+            return motif_df.iloc[:0]
+        
+        cutoff = np.partition(fdr_values, n - 1)[n - 1]
+        top = np.flatnonzero(fdr_values < cutoff)
+        top = np.concatenate([top, np.flatnonzero(fdr_values == cutoff)[:n - len(top)]])
+        return motif_df.iloc[top[np.argsort(fdr_values[top], kind='stable')]]
     
     def create_heatmap(self, motif_df, sequences, top_n=20):
         """
@@ -39,33 +272,60 @@ class MotifVisualizer:
         matplotlib.figure.Figure : Heatmap figure
         """
         if len(motif_df) == 0:
-            fig, ax = plt.subplots(figsize=(10, 6))
+            fig, ax = self._make_fig(figsize=(10, 6))
             ax.text(0.5, 0.5, 'No motifs found', 
                    ha='center', va='center', fontsize=16)
             ax.axis('off')
             return fig
         
         # Select top motifs
-        top_motifs = motif_df.nsmallest(min(top_n, len(motif_df)), 'FDR')
+        top_motifs = self._top_by_fdr(motif_df, top_n)
         motif_list = top_motifs['Motif'].tolist()
         
-        # Create binary matrix
+        # Create binary matrix, assembled as one array rather than per-cell
+        # (one byte per cell)
         seq_ids = sorted(sequences.keys())
-        matrix = pd.DataFrame(0, index=seq_ids, columns=motif_list)
-        
-        for motif in motif_list:
-            for seq_id, sequence in sequences.items():
-                if motif in sequence:
-                    matrix.loc[seq_id, motif] = 1
+        cached = [self._cached_occurrences(motif, sequences) for motif in motif_list]
+        missing = [motif for motif, occurrences in zip(motif_list, cached)
+                   if occurrences is None]
+        if missing and AHOCORASICK_AVAILABLE and all(missing):
+            # Match all motifs not precomputed in one automaton sweep, which
+            # beats testing every sequence once per motif; the occurrences
+            # are kept for create_sequence_logo too
+            found = _search_motifs(sequences, missing)
+            self._store_occurrences(sequences, found)
+            cached = [found[motif] if occurrences is None else occurrences
+                      for motif, occurrences in zip(motif_list, cached)]
+        presence = np.zeros((len(seq_ids), len(motif_list)), dtype=np.uint8)
+        if all(occurrences is not None for occurrences in cached):
+            # Scatter the precomputed hits straight into their cells
+            row_of = {seq_id: row for row, seq_id in enumerate(seq_ids)}
+            for col, occurrences in enumerate(cached):
+                presence[[row_of[seq_id] for seq_id, _ in occurrences], col] = 1
+        else:
+            # One column at a time, testing on bytes where that is exact;
+            # the sequences are put in row order once rather than looked up
+            # by ID for every cell
+            sequence_bytes = self._encoded(sequences)
+            row_sequences = [sequences[seq_id] for seq_id in seq_ids]
+            row_bytes = [sequence_bytes[seq_id] for seq_id in seq_ids]
+            for col, motif in enumerate(motif_list):
+                haystacks, needle = search_space(motif, row_sequences, row_bytes)
+                presence[:, col] = np.fromiter(
+                    (needle in haystack for haystack in haystacks),
+                    dtype=np.uint8,
+                    count=len(seq_ids)
+                )
+        matrix = pd.DataFrame(presence, index=seq_ids, columns=motif_list)
         
         # Create figure
-        fig, ax = plt.subplots(figsize=(max(12, len(motif_list) * 0.5), 
+        fig, ax = self._make_fig(figsize=(max(12, len(motif_list) * 0.5), 
                                         max(8, len(seq_ids) * 0.3)))
         
         # Create heatmap
         sns.heatmap(
             matrix,
-            cmap=['#f0f0f0', '#2E86AB'],  # Light gray for 0, blue for 1
+            cmap=_HEATMAP_CMAP,
             cbar_kws={'label': 'Motif Present', 'ticks': [0, 1]},
             linewidths=0.5,
             linecolor='white',
@@ -82,7 +342,7 @@ class MotifVisualizer:
         plt.setp(ax.get_xticklabels(), rotation=45, ha='right', fontsize=9)
         plt.setp(ax.get_yticklabels(), rotation=0, fontsize=9)
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         return fig
     
@@ -103,57 +363,47 @@ class MotifVisualizer:
         --------
         matplotlib.figure.Figure : Logo figure
         """
-        # Find all occurrences of the motif with flanking regions
-        aligned_seqs = []
-        
-        for seq_id, sequence in sequences.items():
-            # Find all positions of motif
-            start = 0
-            while True:
-                pos = sequence.find(motif, start)
-                if pos == -1:
-                    break
-                
-                # Extract with flanking
-                left_flank = max(0, pos - flanking)
-                right_flank = min(len(sequence), pos + len(motif) + flanking)
-                
-                segment = sequence[left_flank:right_flank]
-                
-                # Pad if at edges
-                if pos < flanking:
-                    segment = 'N' * (flanking - pos) + segment
-                if pos + len(motif) + flanking > len(sequence):
-                    segment = segment + 'N' * (pos + len(motif) + flanking - len(sequence))
-                
-                aligned_seqs.append(segment)
-                start = pos + 1
-        
-        if len(aligned_seqs) == 0:
-            fig, ax = plt.subplots(figsize=(10, 3))
+        # Find all positions of motif
+        occurrences = self._cached_occurrences(motif, sequences)
+        if occurrences is None:
+            occurrences = _search_motif(motif, sequences, self._encoded(sequences))
+        
+        if len(occurrences) == 0:
+            fig, ax = self._make_fig(figsize=(10, 3))
             ax.text(0.5, 0.5, f'Motif "{motif}" not found in sequences', 
                    ha='center', va='center')
             ax.axis('off')
             return fig
         
-        # Create position frequency matrix
-        max_len = max(len(seq) for seq in aligned_seqs)
-        counts_matrix = pd.DataFrame(0, 
+        # Cut every occurrence with its flanking regions out of the
+        # concatenated sequence bytes at once (one row each), padding with N
+        # wherever the window runs past either end of its sequence
+        buffer, starts, lengths, index_of = self._concatenated(sequences)
+        seq_index = np.fromiter((index_of[seq_id] for seq_id, _ in occurrences),
+                                dtype=np.int64, count=len(occurrences))
+        positions = np.fromiter((pos for _, pos in occurrences),
+                                dtype=np.int64, count=len(occurrences))
+        max_len = len(motif) + 2 * flanking
+        offsets = positions[:, None] - flanking + np.arange(max_len)
+        inside = (offsets >= 0) & (offsets < lengths[seq_index, None])
+        window = np.clip(starts[seq_index, None] + offsets, 0, len(buffer) - 1)
+        segments = np.where(inside, buffer[window], np.uint8(ord('N')))
+        
+        # Create position frequency matrix, counting each base down the columns
+        counts = _count_bases(segments)
+        counts_matrix = pd.DataFrame(counts, 
                                      index=['A', 'C', 'G', 'T'], 
                                      columns=range(max_len))
         
-        for seq in aligned_seqs:
-            for pos, base in enumerate(seq):
-                if base in 'ACGT':
-                    counts_matrix.loc[base, pos] += 1
-        
         # Convert to frequency matrix
         freq_matrix = counts_matrix / counts_matrix.sum(axis=0)
         freq_matrix = freq_matrix.T  # Transpose for logomaker
         
         # Create logo
-        fig, ax = plt.subplots(figsize=(max(8, max_len * 0.5), 3))
+        fig, ax = self._make_fig(figsize=(max(8, max_len * 0.5), 3))
         
+        # Imported here so pages that never draw a logo skip its load time
+        import logomaker
         logo = logomaker.Logo(freq_matrix, ax=ax, color_scheme='classic')
         
         # Highlight the motif region
@@ -165,7 +415,7 @@ class MotifVisualizer:
         # Customize
         ax.set_ylabel('Frequency', fontsize=11)
         ax.set_xlabel('Position', fontsize=11)
-        ax.set_title(f'Sequence Logo: {motif} (n={len(aligned_seqs)} occurrences)', 
+        ax.set_title(f'Sequence Logo: {motif} (n={len(segments)} occurrences)', 
                     fontsize=12, fontweight='bold')
         
         # Add position labels
@@ -173,7 +423,7 @@ class MotifVisualizer:
         ax.set_xticks(range(len(positions)))
         ax.set_xticklabels(positions)
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         return fig
     
@@ -193,21 +443,20 @@ class MotifVisualizer:
         matplotlib.figure.Figure : Bar plot figure
         """
         if len(motif_df) == 0:
-            fig, ax = plt.subplots(figsize=(10, 6))
+            fig, ax = self._make_fig(figsize=(10, 6))
             ax.text(0.5, 0.5, 'No motifs found', 
                    ha='center', va='center', fontsize=16)
             ax.axis('off')
             return fig
         
         # Select top motifs by FDR
-        top_motifs = motif_df.nsmallest(min(top_n, len(motif_df)), 'FDR')
+        top_motifs = self._top_by_fdr(motif_df, top_n)
         
         # Create figure
-        fig, ax = plt.subplots(figsize=(10, max(6, len(top_motifs) * 0.4)))
+        fig, ax = self._make_fig(figsize=(10, max(6, len(top_motifs) * 0.4)))
         
         # Create color map based on significance
-        colors = ['#2E86AB' if sig else '#A23B72' 
-                 for sig in top_motifs['Significant']]
+        colors = np.where(top_motifs['Significant'].to_numpy(dtype=bool), '#2E86AB', '#A23B72')
         
         # Create horizontal bar plot
         y_pos = np.arange(len(top_motifs))
@@ -222,9 +471,11 @@ class MotifVisualizer:
         ax.set_title('Top Enriched Motifs', fontsize=14, fontweight='bold', pad=20)
         
         # Add FDR values as text
-        for i, (idx, row) in enumerate(top_motifs.iterrows()):
-            ax.text(row['Fold_Enrichment'] + 0.1, i, 
-                   f"FDR={row['FDR']:.2e}", 
+        fold_enrichments = top_motifs['Fold_Enrichment'].to_numpy()
+        fdr_values = top_motifs['FDR'].to_numpy()
+        for i in range(len(top_motifs)):
+            ax.text(fold_enrichments[i] + 0.1, i, 
+                   f"FDR={fdr_values[i]:.2e}", 
                    va='center', fontsize=9)
         
         # Add legend
@@ -235,7 +486,7 @@ class MotifVisualizer:
         ]
         ax.legend(handles=legend_elements, loc='lower right')
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         return fig
     
@@ -253,25 +504,31 @@ class MotifVisualizer:
         matplotlib.figure.Figure : Histogram figure
         """
         if len(motif_df) == 0:
-            fig, ax = plt.subplots(figsize=(8, 5))
+            fig, ax = self._make_fig(figsize=(8, 5))
             ax.text(0.5, 0.5, 'No motifs found', 
                    ha='center', va='center', fontsize=16)
             ax.axis('off')
             return fig
         
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig, ax = self._make_fig(figsize=(10, 6))
         
-        # Separate significant and non-significant
-        significant = motif_df[motif_df['Significant']]
-        non_significant = motif_df[~motif_df['Significant']]
+        # Separate significant and non-significant with one mask
+        significant = motif_df['Significant'].to_numpy(dtype=bool)
+        motif_lengths = motif_df['Length'].to_numpy()
         
-        # Create histogram
-        bins = np.arange(motif_df['Length'].min(), motif_df['Length'].max() + 2) - 0.5
+        # Create histogram: lengths are integers, so count them directly
+        # with one unit-wide bar per length
+        shortest = motif_lengths.min()
+        lengths = np.arange(shortest, motif_lengths.max() + 1)
+        non_significant_counts = np.bincount(motif_lengths[~significant] - shortest,
+                                             minlength=len(lengths))
+        significant_counts = np.bincount(motif_lengths[significant] - shortest,
+                                         minlength=len(lengths))
         
-        ax.hist(non_significant['Length'], bins=bins, 
-               alpha=0.7, label='Not Significant', color='#A23B72')
-        ax.hist(significant['Length'], bins=bins, 
-               alpha=0.7, label='Significant', color='#2E86AB')
+        ax.bar(lengths, non_significant_counts, width=1.0, 
+              alpha=0.7, label='Not Significant', color='#A23B72')
+        ax.bar(lengths, significant_counts, width=1.0, 
+              alpha=0.7, label='Significant', color='#2E86AB')
         
         # Customize
         ax.set_xlabel('Motif Length (bp)', fontsize=12, fontweight='bold')
@@ -280,7 +537,7 @@ class MotifVisualizer:
         ax.legend()
         ax.grid(axis='y', alpha=0.3)
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         return fig
     
@@ -298,25 +555,25 @@ class MotifVisualizer:
         matplotlib.figure.Figure : Volcano plot figure
         """
         if len(motif_df) == 0:
-            fig, ax = plt.subplots(figsize=(8, 6))
+            fig, ax = self._make_fig(figsize=(8, 6))
             ax.text(0.5, 0.5, 'No motifs found', 
                    ha='center', va='center', fontsize=16)
             ax.axis('off')
             return fig
         
-        fig, ax = plt.subplots(figsize=(10, 8))
+        fig, ax = self._make_fig(figsize=(10, 8))
         
-        # Calculate -log10(FDR)
-        motif_df['neg_log_FDR'] = -np.log10(motif_df['FDR'] + 1e-300)  # Add small value to avoid log(0)
+        # Calculate -log10(FDR) locally, leaving the caller's table untouched
+        fold_enrichments = motif_df['Fold_Enrichment'].to_numpy()
+        neg_log_fdr = -np.log10(motif_df['FDR'].to_numpy() + 1e-300)  # Add small value to avoid log(0)
         
         # Separate significant and non-significant
-        significant = motif_df[motif_df['Significant']]
-        non_significant = motif_df[~motif_df['Significant']]
+        significant = motif_df['Significant'].to_numpy(dtype=bool)
         
         # Plot
-        ax.scatter(non_significant['Fold_Enrichment'], non_significant['neg_log_FDR'],
+        ax.scatter(fold_enrichments[~significant], neg_log_fdr[~significant],
                   alpha=0.5, s=50, c='#A23B72', label='Not Significant')
-        ax.scatter(significant['Fold_Enrichment'], significant['neg_log_FDR'],
+        ax.scatter(fold_enrichments[significant], neg_log_fdr[significant],
                   alpha=0.7, s=50, c='#2E86AB', label='Significant')
         
         # Add horizontal line for FDR threshold
@@ -325,10 +582,13 @@ class MotifVisualizer:
                   linewidth=1, alpha=0.7, label=f'FDR = {fdr_threshold}')
         
         # Label top motifs
-        top_motifs = motif_df.nsmallest(5, 'FDR')
-        for idx, row in top_motifs.iterrows():
-            ax.annotate(row['Motif'], 
-                       xy=(row['Fold_Enrichment'], row['neg_log_FDR']),
+        top_motifs = self._top_by_fdr(motif_df, 5)
+        for motif, fold_enrichment, top_neg_log_fdr in zip(
+                top_motifs['Motif'].to_numpy(),
+                top_motifs['Fold_Enrichment'].to_numpy(),
+                -np.log10(top_motifs['FDR'].to_numpy() + 1e-300)):
+            ax.annotate(motif, 
+                       xy=(fold_enrichment, top_neg_log_fdr),
                        xytext=(5, 5), textcoords='offset points',
                        fontsize=8, alpha=0.8)
         
@@ -339,6 +599,6 @@ class MotifVisualizer:
         ax.legend()
         ax.grid(alpha=0.3)
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         return fig